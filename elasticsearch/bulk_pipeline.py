@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Bulk index song song cho index_all_data.py, thay cho helpers.bulk một luồng:
+
+- Action (dạng của helpers.bulk: _index, _id, _op_type, _source / doc) được
+  serialize sẵn thành NDJSON, gom chunk theo cả số action (--chunk-docs) lẫn
+  số byte (--chunk-mb), để bài viết dài không làm request phình to.
+- Các chunk được gửi bằng es.bulk(operations=...) từ một thread pool; số chunk
+  đang bay bị chặn (threads * 2) nên generator input không bị đọc vượt trước.
+- Item bị từ chối tạm thời (429, 502/503/504) được gửi lại với exponential
+  backoff + jitter, tối đa --max-retries lần; lỗi khác (mapping...) được đếm là
+  failed và in vài mẫu lỗi.
+- Mất kết nối / timeout / 502-504 cho cả request là lỗi mơ hồ: ES có thể đã ghi
+  chunk. Chỉ action có _id (gửi lại thì ghi đè) mới được gửi lại; action tự
+  sinh id được đếm là failed thay vì có thể bị index hai lần.
+- Định kỳ in docs/s và MB/s của từng index.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from elasticsearch import ApiError, TransportError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mapreduce"))
+from jsoncodec import dumps
+
+RETRY_STATUS = {429, 502, 503, 504}
+MAX_ERROR_SAMPLES = 5
+
+
+def encode_action(action) -> bytes:
+    """Action kiểu helpers.bulk -> dòng NDJSON (action + source)."""
+    op = action.get("_op_type", "index")
+    meta = {k: action[k] for k in ("_index", "_id") if k in action}
+    lines = [dumps({op: meta})]
+    if op == "update":
+        lines.append(dumps({k: action[k] for k in ("doc", "doc_as_upsert", "upsert", "script")
+                            if k in action}))
+    elif op != "delete":
+        lines.append(dumps(action["_source"]))
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+class IndexStats:
+    def __init__(self):
+        self.docs = 0
+        self.created = 0
+        self.updated = 0
+        self.deleted = 0
+        self.bytes = 0
+        self.retried = 0
+        self.failed = 0
+
+
+class ParallelBulk:
+    def __init__(self, es, threads=4, chunk_docs=1000, chunk_mb=10, max_retries=5,
+                 backoff=1.0, max_backoff=60.0, report_every=5.0):
+        self.es = es
+        self.threads = max(1, threads)
+        self.chunk_docs = max(1, chunk_docs)
+        self.chunk_bytes = int(chunk_mb * 2**20)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.report_every = report_every
+        self.stats = {}
+        self.errors = []
+        self._lock = threading.Lock()
+
+    # ---------- chunking ----------
+    def _chunks(self, actions):
+        chunk, size = [], 0
+        for action in actions:
+            data = encode_action(action)
+            if chunk and (len(chunk) >= self.chunk_docs or size + len(data) > self.chunk_bytes):
+                yield chunk
+                chunk, size = [], 0
+            chunk.append((action.get("_index"), action.get("_op_type", "index"), data,
+                          "_id" in action))
+            size += len(data)
+        if chunk:
+            yield chunk
+
+    # ---------- gửi một chunk ----------
+    def _sleep(self, attempt):
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(delay * (0.5 + random.random() / 2))
+
+    def _record(self, index, ok=0, created=0, updated=0, deleted=0, nbytes=0, retried=0, failed=0,
+                error=None):
+        with self._lock:
+            st = self.stats.get(index)
+            if st is None:
+                st = self.stats[index] = IndexStats()
+            st.docs += ok
+            st.created += created
+            st.updated += updated
+            st.deleted += deleted
+            st.bytes += nbytes
+            st.retried += retried
+            st.failed += failed
+            if error is not None and len(self.errors) < MAX_ERROR_SAMPLES:
+                self.errors.append(error)
+
+    def _resend(self, chunk, attempt, error, ambiguous):
+        """Chunk cần gửi lại sau lỗi cả request; phần không gửi lại được đếm failed."""
+        retry = []
+        for item in chunk:
+            index, _, _, has_id = item
+            if attempt == self.max_retries or (ambiguous and not has_id):
+                self._record(index, failed=1, error=error)
+            else:
+                self._record(index, retried=1)
+                retry.append(item)
+        return retry
+
+    def _send(self, chunk):
+        for attempt in range(self.max_retries + 1):
+            try:
+                resp = self.es.bulk(operations=b"".join(data for _, _, data, _ in chunk))
+            except ApiError as e:
+                if e.meta.status not in RETRY_STATUS:
+                    chunk = self._resend(chunk, self.max_retries, str(e), False)
+                else:
+                    # 429: ES từ chối cả request; 502-504 (proxy): có thể đã ghi
+                    chunk = self._resend(chunk, attempt, str(e), e.meta.status != 429)
+                if not chunk:
+                    return
+                self._sleep(attempt)
+                continue
+            except TransportError as e:
+                # mất kết nối / timeout: không biết ES đã ghi hay chưa
+                chunk = self._resend(chunk, attempt, str(e), True)
+                if not chunk:
+                    return
+                self._sleep(attempt)
+                continue
+
+            retry = []
+            for (index, op, data, has_id), item in zip(chunk, resp["items"]):
+                result = next(iter(item.values()))
+                status = result.get("status", 500)
+                if status < 300 or (op == "delete" and status == 404):
+                    outcome = result.get("result")
+                    self._record(index, ok=1, created=int(outcome == "created"),
+                                 updated=int(outcome == "updated"),
+                                 deleted=int(outcome == "deleted"), nbytes=len(data))
+                elif status in RETRY_STATUS and attempt < self.max_retries:
+                    self._record(index, retried=1)
+                    retry.append((index, op, data, has_id))
+                else:
+                    self._record(index, failed=1, error=result.get("error"))
+            if not retry:
+                return
+            chunk = retry
+            self._sleep(attempt)
+
+    # ---------- báo cáo ----------
+    def report(self, elapsed, final=False):
+        with self._lock:
+            items = sorted(self.stats.items())
+        for index, st in items:
+            el = max(elapsed, 1e-9)
+            print(f"  [{index}] {st.docs:,} docs  {st.docs / el:,.0f} docs/s  "
+                  f"{st.bytes / 2**20 / el:,.1f} MB/s  retried {st.retried:,}  failed {st.failed:,}"
+                  + (f"  ({elapsed:,.1f}s)" if final else ""))
+
+    def run(self, actions):
+        """Index toàn bộ actions; trả về (success, failed) như helpers.bulk(stats_only=True)."""
+        t0 = time.perf_counter()
+        last = t0
+        inflight = deque()
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            for chunk in self._chunks(actions):
+                while len(inflight) >= self.threads * 2:
+                    inflight.popleft().result()
+                inflight.append(pool.submit(self._send, chunk))
+                now = time.perf_counter()
+                if now - last >= self.report_every:
+                    self.report(now - t0)
+                    last = now
+            while inflight:
+                inflight.popleft().result()
+        self.report(time.perf_counter() - t0, final=True)
+        for err in self.errors:
+            print(f"  error: {err}")
+        success = sum(st.docs for st in self.stats.values())
+        failed = sum(st.failed for st in self.stats.values())
+        return success, failed
@@ -4,41 +4,218 @@ Index all data to Elasticsearch:
 1. Wikipedia documents (from cleaned data)
 2. MapReduce results (wordcount, trends, categories)
 """
-from elasticsearch import Elasticsearch, helpers
+from elasticsearch import Elasticsearch, NotFoundError
+import argparse
+import hashlib
+import re
 import subprocess
 import sys
-import re
-import json
+import os
+import time
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mapreduce"))
+from jsoncodec import loads
+from records import WORDCOUNT, TREND, CAT_KEYWORD, CAT_DOCS
+from bulk_pipeline import IndexStats, ParallelBulk
 
 # Kết nối ES
 es = Elasticsearch(['http://localhost:9200'])
 
 print("Connected to Elasticsearch")
 
-# Đọc keywords từ file
-def load_keywords(filepath='mapreduce/keywords.txt'):
-    keywords = []
+# Keyword của dòng tổng mà reducer_topk.py ghi cho mỗi group
+TOTAL_KEYWORD = "*"
+
+HDFS_CAT = ["hdfs", "dfs", "-cat"]
+
+def hdfs_lines(path):
+    """
+    Đọc từng dòng của output trên HDFS qua pipe `hdfs dfs -cat`, không gom cả
+    output vào bộ nhớ. Bulk helper tiêu thụ chậm thì pipe đầy và hdfs tự dừng
+    (backpressure); index bắt đầu ngay từ những dòng đầu tiên.
+    """
+    proc = subprocess.Popen(HDFS_CAT + [path], stdout=subprocess.PIPE,
+                            encoding="utf-8", errors="replace", bufsize=1 << 20)
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            keywords = [line.strip() for line in f if line.strip()]
-    except:
-        keywords = ['internet', 'mạng', 'website', 'google', 'facebook', 
-                   'phần', 'mềm', 'dữ', 'liệu', 'bảo', 'mật']
-    # Sort by length descending để match từ dài trước
-    keywords.sort(key=len, reverse=True)
-    return keywords
+        yield from proc.stdout
+    except BaseException:
+        # bulk bị dừng giữa chừng (lỗi / generator bị đóng): không đọc tiếp
+        proc.kill()
+        raise
+    finally:
+        proc.stdout.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"hdfs dfs -cat {path} lỗi (exit {returncode})")
+
+# Tham số bulk, ghi đè bởi CLI (--threads, --chunk-docs, --chunk-mb, --max-retries)
+BULK_OPTS = {"threads": 4, "chunk_docs": 1000, "chunk_mb": 10, "max_retries": 5}
+
+# Bulk-load profile (--bulk-load): tạo index với refresh tắt và 0 replica, load
+# xong mới refresh, force-merge về --merge-segments segment rồi trả lại
+# replica / refresh_interval đã cấu hình (merge trước khi bật replica để
+# replica chỉ phải copy segment đã merge).
+BULK_LOAD = {"enabled": False, "merge_segments": 1}
+MERGE_TIMEOUT = 6 * 3600
+INDEX_BODIES = {}
+LOAD_REPORT = []
+
+# Mỗi lần build ghi vào index mới <alias>-<BUILD_ID>; pages query theo alias.
+# Alias chỉ được chuyển (update_aliases, atomic) sang index mới khi số document
+# khớp với số document bulk đã tạo; thế hệ trước được giữ lại để --rollback.
+BUILD_ID = time.strftime("%Y%m%d%H%M%S")
+GENERATION_RE = re.compile(r"\d{14}")
+ALIAS_OF = {}
+UNPUBLISHED = []
+
+def list_generations(alias):
+    """Các index alias-<timestamp> hiện có, cũ -> mới"""
+    names = es.indices.get(index=f"{alias}-*")
+    return sorted(n for n in names if GENERATION_RE.fullmatch(n[len(alias) + 1:]))
+
+def alias_targets(alias):
+    try:
+        return sorted(es.indices.get_alias(name=alias))
+    except NotFoundError:
+        return []
+
+def create_index(alias, body):
+    """Tạo index thế hệ mới cho alias; trả về tên index thật"""
+    index_name = f"{alias}-{BUILD_ID}"
+    INDEX_BODIES[index_name] = body
+    ALIAS_OF[index_name] = alias
+    if BULK_LOAD["enabled"]:
+        settings = dict(body.get("settings", {}), number_of_replicas=0, refresh_interval="-1")
+        body = dict(body, settings=settings)
+    es.indices.create(index=index_name, body=body)
+    print(f"Created index: {index_name}" + (" (bulk-load)" if BULK_LOAD["enabled"] else ""))
+    return index_name
+
+def swap_alias(alias, index_name, current):
+    actions = [{"remove": {"index": i, "alias": alias}} for i in current]
+    if not current and es.indices.exists(index=alias):
+        # index thật trùng tên alias (bản build trước khi có alias): xóa trong cùng lệnh
+        actions.append({"remove_index": {"index": alias}})
+    actions.append({"add": {"index": index_name, "alias": alias}})
+    es.indices.update_aliases(actions=actions)
+
+def publish_index(index_name, stats):
+    """Kiểm tra số document rồi trỏ alias sang index mới; chỉ giữ thêm thế hệ trước"""
+    alias = ALIAS_OF[index_name]
+    count = es.count(index=index_name)["count"]
+    # _id cố định: chunk được gửi lại sau timeout mà ES đã ghi trả về "updated"
+    written = stats.created + stats.updated
+    if stats.failed or count == 0 or count != written:
+        print(f"  NOT published {index_name}: count={count:,}, written={written:,}, "
+              f"failed={stats.failed:,}; alias {alias} giữ nguyên")
+        UNPUBLISHED.append(index_name)
+        return
+
+    current = alias_targets(alias)
+    swap_alias(alias, index_name, current)
+    print(f"  Alias {alias} -> {index_name} ({count:,} docs)"
+          + (f", trước đó: {', '.join(current)}" if current else ""))
+
+    for old in list_generations(alias):
+        if old != index_name and old not in current:
+            es.indices.delete(index=old)
+            print(f"  Deleted old generation: {old}")
+
+def rollback(alias):
+    """Trỏ alias về thế hệ ngay trước thế hệ hiện tại"""
+    current = alias_targets(alias)
+    if not current:
+        print(f"  {alias}: chưa có alias, bỏ qua")
+        return False
+    older = [g for g in list_generations(alias) if g < min(current)]
+    if not older:
+        print(f"  {alias}: không có thế hệ trước để rollback")
+        return False
+    swap_alias(alias, older[-1], current)
+    print(f"  Alias {alias} -> {older[-1]} (từ {', '.join(current)})")
+    return True
+
+def finish_index(index_name, load_seconds):
+    """Sau khi load: refresh, force-merge, trả lại settings cấu hình; ghi thời gian"""
+    t0 = time.perf_counter()
+    if BULK_LOAD["enabled"]:
+        es.indices.refresh(index=index_name)
+        if BULK_LOAD["merge_segments"]:
+            es.options(request_timeout=MERGE_TIMEOUT).indices.forcemerge(
+                index=index_name, max_num_segments=BULK_LOAD["merge_segments"])
+        configured = INDEX_BODIES[index_name].get("settings", {})
+        # None = trả về mặc định của cluster
+        es.indices.put_settings(index=index_name, settings={
+            "number_of_replicas": configured.get("number_of_replicas"),
+            "refresh_interval": configured.get("refresh_interval"),
+        })
+    es.indices.refresh(index=index_name)
+    LOAD_REPORT.append((index_name, es.count(index=index_name)["count"],
+                        load_seconds, time.perf_counter() - t0))
+
+def record_id(schema, *key):
+    """
+    _id cố định từ key của record MapReduce, để gửi lại một chunk (ParallelBulk
+    retry sau timeout) ghi đè thay vì index thêm bản sao. Hash vì key (từ, tên
+    danh mục) có thể dài hơn giới hạn 512 byte của _id.
+    """
+    return hashlib.blake2b(schema.key(*key).encode("utf-8"), digest_size=16).hexdigest()
 
-KEYWORDS = load_keywords()
+def bulk_index(actions, index_names):
+    """
+    Load actions rồi hoàn tất + publish từng index trong index_names. List này
+    được đọc sau khi load xong, nên generator actions có thể tạo index (và thêm
+    vào list) ngay khi gặp dữ liệu đầu tiên của nó.
+    """
+    t0 = time.perf_counter()
+    bulk = ParallelBulk(es, **BULK_OPTS)
+    success, failed = bulk.run(actions)
+    load_seconds = time.perf_counter() - t0
+    for index_name in index_names:
+        finish_index(index_name, load_seconds)
+        publish_index(index_name, bulk.stats.get(index_name) or IndexStats())
+    return success, failed
+
+def print_load_report():
+    mode = "bulk-load" if BULK_LOAD["enabled"] else "normal"
+    print(f"\nLoad report ({mode}):")
+    print(f"  {'index':32s} {'docs':>12s} {'load':>9s} {'optimize':>9s} {'total':>9s}")
+    for index_name, docs, load_s, opt_s in LOAD_REPORT:
+        print(f"  {index_name:32s} {docs:12,d} {load_s:8.1f}s {opt_s:8.1f}s {load_s + opt_s:8.1f}s")
 
 # ============== INDEX 0: WIKI DOCS (Full-text search) ==============
+WIKI_DOCS_PATH = "/data/wiki/clean/docs/part-*"
+
+def wiki_doc_source(doc):
+    """Document cleaned -> _source của wiki_docs, kèm content_hash để index incremental"""
+    source = {
+        "page_id": doc.get("page_id"),
+        "title": doc.get("title"),
+        "timestamp": doc.get("timestamp"),
+        "categories": doc.get("categories", []),
+        "text": doc.get("text", "")
+    }
+    h = hashlib.blake2b(digest_size=8)
+    for field in ("title", "timestamp", "categories", "text"):
+        value = source[field]
+        if isinstance(value, list):
+            value = "\x1f".join(map(str, value))
+        h.update(str(value or "").encode("utf-8"))
+        h.update(b"\0")
+    source["content_hash"] = h.hexdigest()
+    return source
+
+def iter_wiki_docs(path):
+    for line in hdfs_lines(path):
+        if line.strip():
+            try:
+                yield loads(line)
+            except Exception:
+                continue
+
 def index_wiki_docs():
-    index_name = "wiki_docs"
-    
-    if es.indices.exists(index=index_name):
-        es.indices.delete(index=index_name)
-        print(f"Deleted old index: {index_name}")
-    
-    es.indices.create(index=index_name, body={
+    index_name = create_index("wiki_docs", {
         "settings": {
             "number_of_shards": 3,
             "number_of_replicas": 1,
@@ -62,55 +239,109 @@ def index_wiki_docs():
                 },
                 "timestamp": {"type": "date", "format": "iso8601"},
                 "categories": {"type": "keyword"},
-                "text": {"type": "text", "analyzer": "vietnamese"}
+                "text": {"type": "text", "analyzer": "vietnamese"},
+                "content_hash": {"type": "keyword"}
             }
         }
     })
     
-    print(f"Created index: {index_name}")
-    
     def read_data():
-        cmd = "hdfs dfs -cat /data/wiki/clean/docs/part-*"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-        
         count = 0
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                try:
-                    doc = json.loads(line)
-                    count += 1
-                    yield {
-                        "_index": index_name,
-                        "_id": doc.get("page_id", count),
-                        "_source": {
-                            "page_id": doc.get("page_id"),
-                            "title": doc.get("title"),
-                            "timestamp": doc.get("timestamp"),
-                            "categories": doc.get("categories", []),
-                            "text": doc.get("text", "")
-                        }
-                    }
-                    if count % 1000 == 0:
-                        print(f"  Processed {count} documents...")
-                except:
-                    pass
+        for doc in iter_wiki_docs(WIKI_DOCS_PATH):
+            count += 1
+            yield {
+                "_index": index_name,
+                "_id": doc.get("page_id", count),
+                "_source": wiki_doc_source(doc)
+            }
+            if count % 1000 == 0:
+                print(f"  Processed {count} documents...")
     
-    success, failed = helpers.bulk(es, read_data(), raise_on_error=False, stats_only=True)
+    success, failed = bulk_index(read_data(), [index_name])
     print(f"Indexed {success} documents to {index_name}")
     if failed:
         print(f"Failed: {failed}")
 
+def read_tombstones(path):
+    """page_id đã xóa (deleted.txt của xml2jsonl_raw.py --prev-manifest), file local hoặc HDFS"""
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            yield from (line.strip() for line in f if line.strip())
+    else:
+        yield from (line.strip() for line in hdfs_lines(path) if line.strip())
+
+def update_wiki_docs(docs_path, tombstones_path=None):
+    """
+    Index incremental vào index hiện tại của alias wiki_docs (không tạo thế hệ
+    mới): mỗi lô document được so content_hash với bản đã index (mget chỉ lấy
+    content_hash); chỉ document mới / đã đổi được gửi dạng upsert, sau đó xóa
+    các page_id trong danh sách tombstone. Số inserted / updated / deleted lấy
+    từ kết quả từng item của bulk (created / updated / deleted), item lỗi
+    được báo riêng.
+    """
+    current = alias_targets("wiki_docs")
+    if len(current) != 1:
+        raise RuntimeError("alias wiki_docs chưa trỏ tới đúng một index, chạy full build trước")
+    index_name = current[0]
+    stats = {"unchanged": 0, "skipped": 0}
+    batch_size = BULK_OPTS["chunk_docs"]
+
+    def diff(batch):
+        ids = [page_id for page_id, _ in batch]
+        resp = es.mget(index=index_name, ids=ids, source_includes=["content_hash"])
+        indexed = {d["_id"]: (d.get("_source") or {}).get("content_hash")
+                   for d in resp["docs"] if d.get("found")}
+        for page_id, source in batch:
+            if indexed.get(page_id) == source["content_hash"]:
+                stats["unchanged"] += 1
+                continue
+            yield {
+                "_op_type": "update",
+                "_index": index_name,
+                "_id": page_id,
+                "doc": source,
+                "doc_as_upsert": True
+            }
+
+    def read_data():
+        batch = {}
+        for doc in iter_wiki_docs(docs_path):
+            if doc.get("page_id") in (None, ""):
+                stats["skipped"] += 1
+                continue
+            # page_id lặp trong cùng lô: giữ bản sau
+            batch[str(doc["page_id"])] = wiki_doc_source(doc)
+            if len(batch) >= batch_size:
+                yield from diff(list(batch.items()))
+                batch = {}
+        if batch:
+            yield from diff(list(batch.items()))
+        if tombstones_path:
+            for page_id in read_tombstones(tombstones_path):
+                yield {"_op_type": "delete", "_index": index_name, "_id": page_id}
+
+    t0 = time.perf_counter()
+    bulk = ParallelBulk(es, **BULK_OPTS)
+    success, failed = bulk.run(read_data())
+    es.indices.refresh(index=index_name)
+    st = bulk.stats.get(index_name) or IndexStats()
+    # item thành công nhưng không đổi gì: upsert "noop", delete "not_found"
+    noop = st.docs - st.created - st.updated - st.deleted
+
+    print(f"Incremental update of {index_name} in {time.perf_counter() - t0:,.1f}s:")
+    print(f"  unchanged {stats['unchanged']:,}  inserted {st.created:,}  updated {st.updated:,}  "
+          f"deleted {st.deleted:,}" + (f"  noop/not_found {noop:,}" if noop else ""))
+    if stats["skipped"]:
+        print(f"  skipped (không có page_id): {stats['skipped']:,}")
+    if failed:
+        print(f"  failed {failed:,} (upsert / delete không được áp dụng, xem lỗi ở trên; "
+              f"chạy lại --incremental để gửi lại)")
+    return failed
+
+
 # ============== INDEX 1: WORDCOUNT ==============
 def index_wordcount():
-    index_name = "wiki_wordcount"
-    
-    # Xóa index cũ nếu có
-    if es.indices.exists(index=index_name):
-        es.indices.delete(index=index_name)
-        print(f"Deleted old index: {index_name}")
-    
-    # Tạo index mới
-    es.indices.create(index=index_name, body={
+    index_name = create_index("wiki_wordcount", {
         "mappings": {
             "properties": {
                 "word": {"type": "keyword"},
@@ -119,139 +350,140 @@ def index_wordcount():
         }
     })
     
-    print(f"Created index: {index_name}")
-    
     # Đọc dữ liệu
     def read_data():
-        cmd = "hdfs dfs -cat /data/wiki/mr/wordcount/part-*"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-        
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) == 2:
-                    yield {
-                        "_index": index_name,
-                        "_source": {
-                            "word": parts[0],
-                            "count": int(parts[1])
-                        }
+        for line in hdfs_lines("/data/wiki/mr/wordcount/part-*"):
+            rec = WORDCOUNT.parse(line)
+            if rec:
+                word, count = rec
+                yield {
+                    "_index": index_name,
+                    "_id": record_id(WORDCOUNT, word),
+                    "_source": {
+                        "word": word,
+                        "count": count
                     }
+                }
     
     # Bulk index
-    success, failed = helpers.bulk(es, read_data(), raise_on_error=False, stats_only=True)
+    success, failed = bulk_index(read_data(), [index_name])
     print(f"Indexed {success} documents to {index_name}")
     if failed:
         print(f"Failed: {failed}")
 
 
 # ============== INDEX 2: TREND_KWLIST ==============
+# Mỗi độ phân giải của trend job một alias; wiki_trend giữ rollup theo tháng
+TREND_INDICES = {
+    "day": "wiki_trend_day",
+    "week": "wiki_trend_week",
+    "month": "wiki_trend",
+    "year": "wiki_trend_year",
+}
+
+def trend_date(resolution, period):
+    """Ngày đại diện cho một period (tuần ISO -> thứ Hai đầu tuần)"""
+    if resolution == "week":
+        y, w = period.split("-W")
+        return date.fromisocalendar(int(y), int(w), 1).isoformat()
+    return period
+
 def index_trend_kwlist():
-    index_name = "wiki_trend"
-    
-    if es.indices.exists(index=index_name):
-        es.indices.delete(index=index_name)
-        print(f"Deleted old index: {index_name}")
-    
-    es.indices.create(index=index_name, body={
+    body = {
         "mappings": {
             "properties": {
+                "resolution": {"type": "keyword"},
+                "period": {"type": "keyword"},
                 "year": {"type": "keyword"},
                 "month": {"type": "keyword"},
                 "keyword": {"type": "keyword"},
                 "count": {"type": "integer"},
-                "date": {"type": "date", "format": "yyyy-MM"}
+                "total": {"type": "boolean"},
+                "date": {"type": "date", "format": "yyyy-MM-dd||yyyy-MM||yyyy"}
             }
         }
-    })
+    }
+    # resolution -> index thật của lần build này; chỉ tạo khi output có dòng
+    # của resolution đó (job chạy với --resolutions hẹp hơn thì alias của các
+    # resolution còn lại giữ nguyên, không có index rỗng bị từ chối publish)
+    targets = {}
+    index_names = []
     
-    print(f"Created index: {index_name}")
+    def target(resolution):
+        index_name = targets.get(resolution)
+        if index_name is None:
+            index_name = targets[resolution] = create_index(TREND_INDICES[resolution], body)
+            index_names.append(index_name)
+        return index_name
     
     def read_data():
-        cmd = "hdfs dfs -cat /data/wiki/mr/trend/part-*"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-        
-        # Pattern: 2025-11website → year=2025, month=11, keyword=website
-        pattern = re.compile(r'^(\d{4})-(\d{2})(.+)$')
-        
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) == 2:
-                    match = pattern.match(parts[0])
-                    if match:
-                        year = match.group(1)
-                        month = match.group(2)
-                        keyword = match.group(3)
-                        
-                        yield {
-                            "_index": index_name,
-                            "_source": {
-                                "year": year,
-                                "month": month,
-                                "keyword": keyword,
-                                "count": int(parts[1]),
-                                "date": f"{year}-{month}"
-                            }
-                        }
+        # records.TREND: resolution, period, keyword, count
+        for line in hdfs_lines("/data/wiki/mr/trend/part-*"):
+            rec = TREND.parse(line)
+            if not rec or rec[0] not in TREND_INDICES:
+                continue
+            resolution, period, keyword, count = rec
+            try:
+                day = trend_date(resolution, period)
+            except ValueError:
+                continue
+            
+            yield {
+                "_index": target(resolution),
+                "_id": record_id(TREND, resolution, period, keyword),
+                "_source": {
+                    "resolution": resolution,
+                    "period": period,
+                    "year": period[:4],
+                    "month": period[5:7] if resolution in ("day", "month") else None,
+                    "keyword": keyword,
+                    "count": count,
+                    "total": keyword == TOTAL_KEYWORD,
+                    "date": day
+                }
+            }
     
-    success, failed = helpers.bulk(es, read_data(), raise_on_error=False, stats_only=True)
-    print(f"Indexed {success} documents to {index_name}")
+    success, failed = bulk_index(read_data(), index_names)
+    print(f"Indexed {success} documents to {', '.join(index_names) or '(không index nào)'}")
+    skipped = [r for r in TREND_INDICES if r not in targets]
+    if skipped:
+        print(f"No input for resolution {', '.join(skipped)}: "
+              f"{', '.join(TREND_INDICES[r] for r in skipped)} giữ nguyên")
     if failed:
         print(f"Failed: {failed}")
 
 
 # ============== INDEX 3: CAT_KWLIST ==============
 def index_cat_kwlist():
-    index_name = "wiki_cat_kwlist"
-    
-    if es.indices.exists(index=index_name):
-        es.indices.delete(index=index_name)
-        print(f"Deleted old index: {index_name}")
-    
-    es.indices.create(index=index_name, body={
+    index_name = create_index("wiki_cat_kwlist", {
         "mappings": {
             "properties": {
                 "category": {"type": "keyword"},
                 "keyword": {"type": "keyword"},
-                "count": {"type": "integer"}
+                "count": {"type": "integer"},
+                "total": {"type": "boolean"}
             }
         }
     })
     
-    print(f"Created index: {index_name}")
-    
     def read_data():
-        cmd = "hdfs dfs -cat /data/wiki/mr/category_keyword/part-*"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-        
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) == 2:
-                    cat_keyword = parts[0]
-                    
-                    # Tìm keyword khớp từ cuối string (Googlegoogle → Google + google)
-                    matched_keyword = None
-                    for kw in KEYWORDS:
-                        if cat_keyword.endswith(kw):
-                            matched_keyword = kw
-                            break
-                    
-                    if matched_keyword:
-                        category = cat_keyword[:-len(matched_keyword)]
-                        
-                        if category:  # Đảm bảo có category
-                            yield {
-                                "_index": index_name,
-                                "_source": {
-                                    "category": category,
-                                    "keyword": matched_keyword,
-                                    "count": int(parts[1])
-                                }
-                            }
+        # records.CAT_KEYWORD: category, keyword, count (keyword "*" = dòng tổng)
+        for line in hdfs_lines("/data/wiki/mr/category_keyword/part-*"):
+            rec = CAT_KEYWORD.parse(line)
+            if rec and rec[0]:
+                category, keyword, count = rec
+                yield {
+                    "_index": index_name,
+                    "_id": record_id(CAT_KEYWORD, category, keyword),
+                    "_source": {
+                        "category": category,
+                        "keyword": keyword,
+                        "count": count,
+                        "total": keyword == TOTAL_KEYWORD
+                    }
+                }
     
-    success, failed = helpers.bulk(es, read_data(), raise_on_error=False, stats_only=True)
+    success, failed = bulk_index(read_data(), [index_name])
     print(f"Indexed {success} documents to {index_name}")
     if failed:
         print(f"Failed: {failed}")
@@ -259,13 +491,7 @@ def index_cat_kwlist():
 
 # ============== INDEX 4: CAT_DOCS ==============
 def index_cat_docs():
-    index_name = "wiki_cat_docs"
-    
-    if es.indices.exists(index=index_name):
-        es.indices.delete(index=index_name)
-        print(f"Deleted old index: {index_name}")
-    
-    es.indices.create(index=index_name, body={
+    index_name = create_index("wiki_cat_docs", {
         "mappings": {
             "properties": {
                 "category": {"type": "keyword"},
@@ -274,32 +500,70 @@ def index_cat_docs():
         }
     })
     
-    print(f"Created index: {index_name}")
-    
     def read_data():
-        cmd = "hdfs dfs -cat /data/wiki/mr/category_stats/part-*"
-        result = subprocess.run(cmd, shell=True, capture_output=True, text=True, encoding='utf-8')
-        
-        for line in result.stdout.strip().split('\n'):
-            if line.strip():
-                parts = line.split('\t')
-                if len(parts) == 2:
-                    yield {
-                        "_index": index_name,
-                        "_source": {
-                            "category": parts[0],
-                            "doc_count": int(parts[1])
-                        }
+        for line in hdfs_lines("/data/wiki/mr/category_stats/part-*"):
+            rec = CAT_DOCS.parse(line)
+            if rec:
+                category, doc_count = rec
+                yield {
+                    "_index": index_name,
+                    "_id": record_id(CAT_DOCS, category),
+                    "_source": {
+                        "category": category,
+                        "doc_count": doc_count
                     }
+                }
     
-    success, failed = helpers.bulk(es, read_data(), raise_on_error=False, stats_only=True)
+    success, failed = bulk_index(read_data(), [index_name])
     print(f"Indexed {success} documents to {index_name}")
     if failed:
         print(f"Failed: {failed}")
 
 
 # ============== MAIN ==============
+ALIASES = ["wiki_docs", "wiki_wordcount", *TREND_INDICES.values(), "wiki_cat_kwlist", "wiki_cat_docs"]
+
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Index dữ liệu đã xử lý vào Elasticsearch")
+    ap.add_argument("--threads", type=int, default=BULK_OPTS["threads"],
+                    help="số thread gửi bulk song song")
+    ap.add_argument("--chunk-docs", type=int, default=BULK_OPTS["chunk_docs"],
+                    help="số action tối đa mỗi request bulk")
+    ap.add_argument("--chunk-mb", type=float, default=BULK_OPTS["chunk_mb"],
+                    help="kích thước tối đa (MB) mỗi request bulk")
+    ap.add_argument("--max-retries", type=int, default=BULK_OPTS["max_retries"],
+                    help="số lần gửi lại item bị từ chối (429/503) với backoff")
+    ap.add_argument("--bulk-load", action="store_true",
+                    help="tạo index với refresh tắt và 0 replica, bật lại + force-merge sau khi load")
+    ap.add_argument("--merge-segments", type=int, default=BULK_LOAD["merge_segments"],
+                    help="số segment sau force-merge ở chế độ --bulk-load (0 = không merge)")
+    ap.add_argument("--rollback", nargs="*", metavar="ALIAS",
+                    help="trỏ alias (mặc định: tất cả) về thế hệ index trước rồi thoát, không index")
+    ap.add_argument("--incremental", action="store_true",
+                    help="chỉ cập nhật wiki_docs tại chỗ: upsert document mới/đã đổi theo content_hash, xóa tombstone")
+    ap.add_argument("--docs", default=WIKI_DOCS_PATH,
+                    help="đường dẫn HDFS của document cleaned cho --incremental")
+    ap.add_argument("--tombstones", metavar="PATH",
+                    help="danh sách page_id đã xóa cho --incremental (file local hoặc HDFS)")
+    args = ap.parse_args()
+
+    if args.rollback is not None:
+        print("Rollback aliases:")
+        ok = [rollback(alias) for alias in (args.rollback or ALIASES)]
+        sys.exit(0 if all(ok) else 1)
+
+    BULK_LOAD.update(enabled=args.bulk_load, merge_segments=args.merge_segments)
+    BULK_OPTS.update(threads=args.threads, chunk_docs=args.chunk_docs,
+                     chunk_mb=args.chunk_mb, max_retries=args.max_retries)
+
+    if args.incremental:
+        try:
+            failed = update_wiki_docs(args.docs, args.tombstones)
+        except Exception as e:
+            print(f"\nERROR: {str(e)}")
+            sys.exit(1)
+        sys.exit(1 if failed else 0)
+
     print("=" * 60)
     print("INDEXING ALL DATA TO ELASTICSEARCH")
     print("=" * 60)
@@ -321,18 +585,26 @@ if __name__ == "__main__":
         index_cat_docs()
         
         print("\n" + "=" * 60)
-        print("ALL DONE! Successfully indexed all data to Elasticsearch")
+        if UNPUBLISHED:
+            print("DONE WITH ERRORS: some indices were not published")
+        else:
+            print("ALL DONE! Successfully indexed all data to Elasticsearch")
         print("=" * 60)
         
+        print_load_report()
+        
         # Kiểm tra số lượng documents
         print("\nIndex Statistics:")
-        indices = ["wiki_docs", "wiki_wordcount", "wiki_trend", "wiki_cat_kwlist", "wiki_cat_docs"]
-        for idx in indices:
+        for idx in ALIASES:
             try:
                 count = es.count(index=idx)['count']
-                print(f"  - {idx}: {count:,} documents")
+                print(f"  - {idx} -> {', '.join(alias_targets(idx)) or '?'}: {count:,} documents")
             except:
                 print(f"  - {idx}: (not found)")
+        
+        if UNPUBLISHED:
+            print(f"\nNot published (giữ lại để kiểm tra): {', '.join(UNPUBLISHED)}")
+            sys.exit(1)
     
     except Exception as e:
         print(f"\nERROR: {str(e)}")
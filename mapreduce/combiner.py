@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+In-mapper combining: cộng dồn count theo key ngay trong mapper thay vì ghi
+`key\t1` cho từng lần xuất hiện, giảm mạnh lượng dữ liệu qua sort/shuffle.
+
+Bảng có trần bộ nhớ (ước lượng); khi vượt trần, các key ít được dùng gần đây
+nhất (LRU) được ghi ra trước với count tạm thời. Reducer cộng các count này
+nên tổng cuối cùng không đổi.
+
+Khi chạy Hadoop streaming, nhớ gửi kèm file này: -files mapper_x.py,combiner.py
+"""
+import sys
+from collections import OrderedDict
+
+# Ước lượng byte cho một entry (node OrderedDict + slot dict + int)
+ENTRY_OVERHEAD = 160
+
+
+class BoundedCounter:
+    def __init__(self, max_mb: float = 64, out=None, low_water: float = 0.8):
+        self.max_bytes = int(max_mb * 2**20)
+        self.low_bytes = int(self.max_bytes * low_water)
+        self.out = out or sys.stdout
+        self.table = OrderedDict()
+        self.bytes = 0
+        self.evicted = 0
+
+    @staticmethod
+    def _size(key: str) -> int:
+        return ENTRY_OVERHEAD + 2 * len(key)
+
+    def add(self, key: str, n: int = 1):
+        table = self.table
+        v = table.get(key)
+        if v is None:
+            table[key] = n
+            self.bytes += self._size(key)
+            if self.bytes > self.max_bytes:
+                self._evict()
+        else:
+            table[key] = v + n
+            table.move_to_end(key)
+
+    def _evict(self):
+        # ghi theo lô tới mức low_water để không phải evict từng key một
+        table, write = self.table, self.out.write
+        while self.bytes > self.low_bytes and table:
+            key, v = table.popitem(last=False)
+            self.bytes -= self._size(key)
+            self.evicted += 1
+            write(f"{key}\t{v}\n")
+
+    def flush(self):
+        write = self.out.write
+        for key, v in self.table.items():
+            write(f"{key}\t{v}\n")
+        self.table.clear()
+        self.bytes = 0
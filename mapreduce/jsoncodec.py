@@ -0,0 +1,116 @@
+"""
+JSON codec dùng chung cho các mapper và indexer.
+
+- loads / dumps: backend đầu tiên có sẵn theo thứ tự cố định orjson -> ujson
+  -> json (mọi task trên mọi node chọn giống nhau, không phụ thuộc phép đo
+  lúc import). Ép backend bằng biến môi trường JSONCODEC_BACKEND=json|orjson|ujson
+  (tools/bench_codec.py để so tốc độ trên dữ liệu thật).
+  dumps của mọi backend cho cùng một chuỗi: compact (không khoảng trắng sau
+  `,` / `:`) và giữ nguyên ký tự không phải ASCII như orjson.
+- project(line, fields): chỉ giải mã các key cần thiết của một dòng JSON object,
+  các value khác được bỏ qua mà không tạo object Python. Có lợi khi không cần
+  field `text` (ví dụ mapper_cat_docs chỉ cần `categories`); nếu cần cả `text`
+  thì loads nguyên dòng vẫn nhanh hơn.
+
+Khi chạy Hadoop streaming, nhớ gửi kèm file này: -files mapper_x.py,jsoncodec.py
+"""
+import json
+import os
+import re
+from json.decoder import scanstring
+
+
+def _backends():
+    found = {}
+    found["json"] = (
+        json.loads,
+        lambda obj: json.dumps(obj, ensure_ascii=False, separators=(",", ":")),
+    )
+    try:
+        import orjson
+
+        found["orjson"] = (orjson.loads, lambda obj: orjson.dumps(obj).decode("utf-8"))
+    except ImportError:
+        pass
+    try:
+        import ujson
+
+        found["ujson"] = (
+            ujson.loads,
+            lambda obj: ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False),
+        )
+    except ImportError:
+        pass
+    return found
+
+
+PREFERENCE = ("orjson", "ujson", "json")
+
+
+def _pick(found):
+    forced = os.environ.get("JSONCODEC_BACKEND")
+    if forced:
+        if forced not in found:
+            raise ImportError(f"JSONCODEC_BACKEND={forced}: backend không có sẵn "
+                              f"(có: {', '.join(sorted(found))})")
+        return forced
+    return next(name for name in PREFERENCE if name in found)
+
+
+_FOUND = _backends()
+BACKEND = _pick(_FOUND)
+loads, dumps = _FOUND[BACKEND]
+
+_WS = re.compile(r"[ \t\n\r]*")
+_STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+_raw_decode = json.JSONDecoder().raw_decode
+
+
+def _skip_value(s: str, i: int) -> int:
+    if s.startswith('"', i):
+        m = _STRING.match(s, i)
+        if m is None:
+            raise ValueError(f"Unterminated string at {i}")
+        return m.end()
+    return _raw_decode(s, i)[1]
+
+
+def project(line: str, fields) -> dict:
+    """
+    Giải mã một JSON object nhưng chỉ lấy các key trong `fields`.
+    Dừng ngay khi đã đủ key; key không có trong dòng thì không có trong kết quả.
+    Dòng không hợp lệ -> ValueError.
+    """
+    want = fields if isinstance(fields, (set, frozenset)) else frozenset(fields)
+    out = {}
+    ws = _WS.match
+    i = ws(line, 0).end()
+    if not line.startswith("{", i):
+        raise ValueError("Expecting JSON object")
+    i = ws(line, i + 1).end()
+    if line.startswith("}", i):
+        return out
+
+    while True:
+        if not line.startswith('"', i):
+            raise ValueError(f"Expecting key at {i}")
+        key, i = scanstring(line, i + 1)
+        i = ws(line, i).end()
+        if not line.startswith(":", i):
+            raise ValueError(f"Expecting ':' at {i}")
+        i = ws(line, i + 1).end()
+
+        if key in want:
+            out[key], i = _raw_decode(line, i)
+            if len(out) == len(want):
+                return out
+        else:
+            i = _skip_value(line, i)
+
+        i = ws(line, i).end()
+        if line.startswith(",", i):
+            i = ws(line, i + 1).end()
+        elif line.startswith("}", i):
+            return out
+        else:
+            raise ValueError(f"Expecting ',' or '}}' at {i}")
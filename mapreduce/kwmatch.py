@@ -0,0 +1,103 @@
+"""
+So khớp nhiều keyword / cụm từ cùng lúc bằng automaton Aho-Corasick trên chuỗi
+token (không phải ký tự): "dữ liệu" là cụm 2 token ("dữ", "liệu").
+
+Mỗi document chỉ cần một lượt duyệt token, thời gian tuyến tính theo số token
+cộng số lần khớp, không phụ thuộc số keyword (100k+ keyword vẫn nhanh). Token
+không xuất hiện trong keyword nào đưa automaton về gốc ngay, không phải đi
+theo chuỗi fail.
+
+Ký hiệu (symbol) của automaton là bất kỳ giá trị hashable nào: chuỗi token, hoặc
+token id nguyên khi chạy trên token stream.
+
+Khi chạy Hadoop streaming, nhớ gửi kèm file này: -files mapper_x.py,kwmatch.py
+"""
+from collections import deque
+
+
+class KeywordMatcher:
+    def __init__(self, phrases):
+        """
+        phrases: iterable các cặp (sequence symbol, nhãn); nhãn là giá trị được
+        trả về khi khớp (thường là chuỗi keyword đã chuẩn hóa).
+        """
+        self.goto = [{}]     # state -> {symbol: state}
+        self.fail = [0]
+        self.out = [()]      # state -> nhãn khớp tại state (đã gộp theo fail)
+        self.vocab = set()   # mọi symbol xuất hiện trong keyword
+
+        labels = {}
+        for seq, label in phrases:
+            seq = tuple(seq)
+            if not seq:
+                continue
+            state = 0
+            for sym in seq:
+                nxt = self.goto[state].get(sym)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][sym] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+                self.vocab.add(sym)
+            labels.setdefault(state, []).append(label)
+
+        for state, ls in labels.items():
+            self.out[state] = tuple(dict.fromkeys(ls))
+        self._build_fail()
+
+    def _build_fail(self):
+        goto, fail, out = self.goto, self.fail, self.out
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for sym, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and sym not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(sym, 0)
+                fail[nxt] = target if target != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt] = out[nxt] + out[fail[nxt]]
+
+    def __len__(self):
+        return len(self.goto)
+
+    def count(self, symbols, counts=None) -> dict:
+        """Đếm số lần khớp của từng nhãn trong dãy symbol; cộng dồn vào counts."""
+        if counts is None:
+            counts = {}
+        goto, fail, out, vocab = self.goto, self.fail, self.out, self.vocab
+        state = 0
+        for sym in symbols:
+            if sym not in vocab:
+                state = 0
+                continue
+            while True:
+                nxt = goto[state].get(sym)
+                if nxt is not None:
+                    state = nxt
+                    break
+                if state == 0:
+                    break
+                state = fail[state]
+            for label in out[state]:
+                counts[label] = counts.get(label, 0) + 1
+        return counts
+
+
+def load_phrases(path, tokenize, norm):
+    """
+    Đọc file keyword (mỗi dòng một keyword hoặc cụm từ), trả về các cặp
+    (tuple token, nhãn); nhãn là các token nối bằng một dấu cách.
+    """
+    phrases = []
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for line in f:
+            toks = tuple(tokenize(norm(line.strip())))
+            if toks:
+                phrases.append((toks, " ".join(toks)))
+    return phrases
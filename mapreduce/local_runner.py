@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Chạy thử một cặp mapper/reducer streaming trên máy local, mô phỏng Hadoop
+streaming, không cần cluster:
+
+    python mapreduce/local_runner.py -i 'wiki_clean/*.jsonl*' -o out/wordcount \\
+        -m mapper_wc.py -r reducer_sum.py --reducers 4 --workers 8
+
+- Map: mỗi shard input là một map task chạy trong process pool; output của
+  mapper được chia partition theo hash của key (mặc định phần trước TAB đầu
+  tiên; --key-fields N như -D stream.num.map.output.key.fields=N).
+- Sort: mỗi partition được sort theo key, tràn ra đĩa thành các run đã sort
+  khi vượt ngân sách bộ nhớ (--sort-mb), rồi merge ngoài (external merge sort).
+- Reduce: mỗi partition được merge và đưa vào stdin của reducer, y như Hadoop.
+  Không có -r thì là job map-only (giống -numReduceTasks 0).
+- --partition-fields M: chia partition theo M field đầu của key (như
+  KeyFieldBasedPartitioner -k1,M), để cả group về cùng một reducer; xem
+  records.py.
+- --no-sort: bỏ hẳn pha sort, dùng với reducer không cần input đã sort
+  (vd: "reducer_sum.py --hash").
+
+Mapper/reducer chạy với thư mục làm việc là thư mục chứa script (như các file
+được gửi bằng -files), nên keywords.txt, stopwords_vi.txt... được tìm thấy.
+"""
+import argparse
+import bz2
+import functools
+import glob
+import gzip
+import heapq
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Ước lượng byte cho mỗi dòng nằm trong buffer (object bytes + slot list)
+LINE_OVERHEAD = 64
+MERGE_FAN_IN = 64
+
+
+def open_input(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    return open(path, "rb")
+
+
+def resolve_cmd(spec: str):
+    """'mapper_wc.py --max-mb 64' -> [python, /abs/mapper_wc.py, --max-mb, 64], cwd."""
+    argv = shlex.split(spec)
+    script = argv[0]
+    if not os.path.exists(script):
+        script = os.path.join(HERE, script)
+    script = os.path.abspath(script)
+    return [sys.executable, script] + argv[1:], os.path.dirname(script)
+
+
+def sort_key(line: bytes, fields: int = 1) -> bytes:
+    """N field đầu của dòng; dòng có ít field hơn thì cả dòng là key (như Hadoop)."""
+    i = -1
+    for _ in range(fields):
+        i = line.find(b"\t", i + 1)
+        if i < 0:
+            return line.rstrip(b"\n")
+    return line[:i]
+
+
+def partition_of(key: bytes, reducers: int, fields: int = 0) -> int:
+    if fields:
+        key = sort_key(key, fields)
+    return zlib.crc32(key) % reducers
+
+
+def _feed(src_path: str, proc):
+    try:
+        with open_input(src_path) as f:
+            shutil.copyfileobj(f, proc.stdin, 1 << 20)
+    except BrokenPipeError:
+        pass
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+
+
+def _spill(buffers, tmp_dir, task_id, run_no, runs, do_sort=True, key=sort_key):
+    for p, buf in enumerate(buffers):
+        if not buf:
+            continue
+        if do_sort:
+            buf.sort(key=key)
+        path = os.path.join(tmp_dir, f"map{task_id:05d}-p{p:05d}-r{run_no:04d}")
+        with open(path, "wb") as f:
+            f.writelines(buf)
+        runs[p].append(path)
+        buf.clear()
+
+
+def map_task(args):
+    task_id, src_path, mapper, reducers, sort_bytes, tmp_dir, out_dir, do_sort, key_fields, part_fields = args
+    key = functools.partial(sort_key, fields=key_fields)
+    t0 = time.perf_counter()
+    cmd, cwd = resolve_cmd(mapper)
+    proc = subprocess.Popen(cmd, cwd=cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+    feeder = threading.Thread(target=_feed, args=(src_path, proc), daemon=True)
+    feeder.start()
+
+    records = 0
+    out_bytes = 0
+    runs = [[] for _ in range(reducers)]
+
+    if reducers == 0:
+        with open(os.path.join(out_dir, f"part-m-{task_id:05d}"), "wb") as out:
+            for line in proc.stdout:
+                out.write(line)
+                records += 1
+                out_bytes += len(line)
+    else:
+        buffers = [[] for _ in range(reducers)]
+        used = 0
+        run_no = 0
+        for line in proc.stdout:
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            buffers[partition_of(key(line), reducers, part_fields)].append(line)
+            records += 1
+            out_bytes += len(line)
+            used += len(line) + LINE_OVERHEAD
+            if used >= sort_bytes:
+                _spill(buffers, tmp_dir, task_id, run_no, runs, do_sort, key)
+                run_no += 1
+                used = 0
+        _spill(buffers, tmp_dir, task_id, run_no, runs, do_sort, key)
+
+    feeder.join()
+    if proc.wait() != 0:
+        raise RuntimeError(f"mapper lỗi (exit {proc.returncode}) trên {src_path}")
+    return {
+        "input": src_path,
+        "in_bytes": os.path.getsize(src_path),
+        "records": records,
+        "out_bytes": out_bytes,
+        "runs": runs,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def merge_runs(paths, tmp_dir, tag, key=sort_key):
+    """Merge nhiều lượt nếu số run vượt MERGE_FAN_IN; trả về danh sách run còn lại."""
+    level = 0
+    while len(paths) > MERGE_FAN_IN:
+        merged = []
+        for g in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[g:g + MERGE_FAN_IN]
+            out_path = os.path.join(tmp_dir, f"{tag}-m{level}-{g:05d}")
+            files = [open(p, "rb") for p in group]
+            with open(out_path, "wb") as out:
+                out.writelines(heapq.merge(*files, key=key))
+            for f in files:
+                f.close()
+            for p in group:
+                os.remove(p)
+            merged.append(out_path)
+        paths = merged
+        level += 1
+    return paths
+
+
+def _concat(paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            yield from f
+
+
+def reduce_task(args):
+    part, runs, reducer, tmp_dir, out_dir, do_sort, key_fields = args
+    t0 = time.perf_counter()
+    key = functools.partial(sort_key, fields=key_fields)
+    if do_sort:
+        runs = merge_runs(runs, tmp_dir, f"reduce{part:05d}", key)
+    cmd, cwd = resolve_cmd(reducer)
+
+    out_path = os.path.join(out_dir, f"part-{part:05d}")
+    records = 0
+    with open(out_path, "wb") as out:
+        proc = subprocess.Popen(cmd, cwd=cwd, stdin=subprocess.PIPE, stdout=out)
+        files = [open(p, "rb") for p in runs] if do_sort else []
+        lines = heapq.merge(*files, key=key) if do_sort else _concat(runs)
+        try:
+            for line in lines:
+                proc.stdin.write(line)
+                records += 1
+            proc.stdin.close()
+        finally:
+            for f in files:
+                f.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"reducer lỗi (exit {proc.returncode}) ở partition {part}")
+    return {
+        "part": part,
+        "records": records,
+        "out_bytes": os.path.getsize(out_path),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def fmt_rate(nbytes, seconds):
+    return f"{nbytes / 2**20:,.1f} MB in {seconds:,.2f}s ({nbytes / 2**20 / max(seconds, 1e-9):,.1f} MB/s)"
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Local Hadoop-streaming runner")
+    ap.add_argument("-i", "--input", action="append", required=True,
+                    help="file / glob JSONL input (.gz, .bz2 được), lặp lại được")
+    ap.add_argument("-o", "--output", required=True, help="thư mục output (phải chưa tồn tại)")
+    ap.add_argument("-m", "--mapper", required=True, help='vd: "mapper_wc.py --max-mb 64"')
+    ap.add_argument("-r", "--reducer", help="bỏ trống = job map-only")
+    ap.add_argument("--reducers", type=int, default=1, help="số reduce task / partition")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--sort-mb", type=float, default=256,
+                    help="ngân sách bộ nhớ sort của mỗi map task trước khi tràn ra đĩa")
+    ap.add_argument("--key-fields", type=int, default=1,
+                    help="số field (phân cách TAB) của key, như stream.num.map.output.key.fields")
+    ap.add_argument("--partition-fields", type=int, default=0,
+                    help="partition theo M field đầu của key (KeyFieldBasedPartitioner -k1,M)")
+    ap.add_argument("--no-sort", action="store_true",
+                    help="bỏ pha sort (reducer phải tự gom key, vd reducer_sum.py --hash)")
+    ap.add_argument("--tmp", help="thư mục tạm cho các run (mặc định trong output)")
+    args = ap.parse_args()
+
+    inputs = sorted({p for pattern in args.input for p in glob.glob(pattern)})
+    if not inputs:
+        ap.error("không có file input nào khớp")
+    if os.path.exists(args.output):
+        ap.error(f"output đã tồn tại: {args.output}")
+    os.makedirs(args.output)
+    tmp_dir = tempfile.mkdtemp(prefix="_tmp-", dir=args.tmp or args.output)
+    reducers = args.reducers if args.reducer else 0
+
+    t_start = time.perf_counter()
+    do_sort = not args.no_sort
+    if not 0 <= args.partition_fields <= args.key_fields:
+        ap.error("--partition-fields phải nằm trong [0, --key-fields]")
+    tasks = [(i, path, args.mapper, reducers, int(args.sort_mb * 2**20), tmp_dir, args.output,
+              do_sort, args.key_fields, args.partition_fields)
+             for i, path in enumerate(inputs)]
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        maps = list(pool.map(map_task, tasks))
+    t_map = time.perf_counter() - t_start
+
+    in_bytes = sum(m["in_bytes"] for m in maps)
+    map_out = sum(m["out_bytes"] for m in maps)
+    map_records = sum(m["records"] for m in maps)
+    print(f"[map]    {len(maps)} tasks, input {fmt_rate(in_bytes, t_map)}")
+    print(f"         output {map_records:,} records, {map_out / 2**20:,.1f} MB")
+
+    if reducers:
+        t0 = time.perf_counter()
+        runs = [[] for _ in range(reducers)]
+        for m in maps:
+            for p, paths in enumerate(m["runs"]):
+                runs[p].extend(paths)
+        spills = sum(len(r) for r in runs)
+        tasks = [(p, runs[p], args.reducer, tmp_dir, args.output, do_sort, args.key_fields)
+                 for p in range(reducers)]
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            reds = list(pool.map(reduce_task, tasks))
+        t_red = time.perf_counter() - t0
+        print(f"[reduce] {reducers} tasks, {spills} {'sorted ' if do_sort else ''}runs, shuffle {fmt_rate(map_out, t_red)}")
+        print(f"         output {sum(r['out_bytes'] for r in reds) / 2**20:,.1f} MB")
+
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    total = time.perf_counter() - t_start
+    print(f"[total]  {total:,.2f}s, {in_bytes / 2**20 / max(total, 1e-9):,.1f} MB/s input")
+
+
+if __name__ == "__main__":
+    main()
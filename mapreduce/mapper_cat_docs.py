@@ -1,5 +1,11 @@
 #!/usr/bin/env python3
-import sys, json
+import sys
+
+from jsoncodec import project
+from records import CAT_DOCS, clean_field
+
+# chỉ cần categories, không phải giải mã field text
+FIELDS = ("categories",)
 
 def main():
     for line in sys.stdin:
@@ -7,13 +13,13 @@ def main():
         if not line:
             continue
         try:
-            obj = json.loads(line)
+            obj = project(line, FIELDS)
         except:
             continue
         for c in (obj.get("categories") or []):
-            c = str(c).strip()
+            c = clean_field(str(c).strip())
             if c:
-                sys.stdout.write(f"{c}\t1\n")
+                sys.stdout.write(CAT_DOCS.format(c, 1))
 
 if __name__ == "__main__":
     main()
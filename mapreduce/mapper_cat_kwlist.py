@@ -1,30 +1,57 @@
 #!/usr/bin/env python3
-import sys, json, re, unicodedata
+import sys, re, argparse, unicodedata
+
+from jsoncodec import loads
+from kwmatch import KeywordMatcher, load_phrases
+from records import CAT_KEYWORD, clean_field
 
 TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
-SEP = "\x01"
 
 def norm(s: str) -> str:
     return unicodedata.normalize("NFKC", s).casefold()
 
 def load_keywords(path="keywords.txt"):
-    ks = set()
-    with open(path, "r", encoding="utf-8-sig") as f:
-        for line in f:
-            w = line.strip()
-            if w:
-                ks.add(norm(w))
-    return ks
+    # keyword có thể là cụm nhiều âm tiết ("dữ liệu"): so khớp trên chuỗi token
+    return KeywordMatcher(load_phrases(path, TOKEN_RE.findall, norm))
 
 KEYS = load_keywords()
 
+def main_tokens(path):
+    # Đầu vào là token stream (tokstream.py): khớp keyword trên token id
+    from tokstream import TokenStream, iter_docs
+
+    ts = TokenStream(path)
+    keys = KeywordMatcher(ts.phrase_ids(load_phrases("keywords.txt", TOKEN_RE.findall, norm)))
+    cat_names = [clean_field(c.strip()) for c in ts.categories.items]
+
+    for _, _, cat_ids, tok_ids in iter_docs(sys.stdin.buffer):
+        if not cat_ids:
+            continue
+        cnt = keys.count(tok_ids)
+        if not cnt:
+            continue
+        for cid in cat_ids:
+            c = cat_names[cid]
+            if not c:
+                continue
+            for k, v in cnt.items():
+                sys.stdout.write(CAT_KEYWORD.format(c, k, v))
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--tokens", metavar="DIR",
+                    help="đọc token stream nhị phân từ stdin, từ vựng trong DIR")
+    args = ap.parse_args()
+    if args.tokens:
+        main_tokens(args.tokens)
+        return
+
     for line in sys.stdin:
         line = line.strip()
         if not line:
             continue
         try:
-            obj = json.loads(line)
+            obj = loads(line)
         except:
             continue
 
@@ -33,19 +60,16 @@ def main():
             continue
 
         text = norm(obj.get("text") or "")
-        cnt = {}
-        for tok in TOKEN_RE.findall(text):
-            if tok in KEYS:
-                cnt[tok] = cnt.get(tok, 0) + 1
+        cnt = KEYS.count(TOKEN_RE.findall(text))
         if not cnt:
             continue
 
         for c in cats:
-            c = str(c).strip()
+            c = clean_field(str(c).strip())
             if not c:
                 continue
             for k, v in cnt.items():
-                sys.stdout.write(f"{c}{SEP}{k}\t{v}\n")
+                sys.stdout.write(CAT_KEYWORD.format(c, k, v))
 
 if __name__ == "__main__":
     main()
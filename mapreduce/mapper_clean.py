@@ -1,52 +1,406 @@
-import sys, json, re
+import sys, os, re, argparse, hashlib, sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import jsoncodec
+from jsoncodec import loads, dumps
 
 sys.stdin.reconfigure(encoding="utf-8", errors="replace")
 sys.stdout.reconfigure(encoding="utf-8")
 
+# Các điểm scanner cần dừng lại; phần text giữa chúng được chép nguyên.
+# Dấu đóng (}}, |}, ]]) và '|' (tách phần hiển thị của link) chỉ được tìm
+# khi đang có cặp mở tương ứng, xem _special_re.
+OPENERS = r"<!--|<|\{\{|\{\||\[\[|''"
+REF_CLOSE_RE = re.compile(r"</ref\s*>", re.I)
 cat_re = re.compile(r"\[\[\s*Thể\s*loại\s*:\s*([^\]|]+)", re.I)
 
-def clean_wikitext(text: str) -> str:
+_SPECIAL = {}
+
+
+def _special_re(braces: bool, links: bool, bar: bool):
+    key = (braces, links, bar)
+    rx = _SPECIAL.get(key)
+    if rx is None:
+        alts = [OPENERS]
+        if braces:
+            alts.append(r"\}\}|\|\}")
+        if links:
+            alts.append(r"\]\]")
+        if bar:
+            alts.append(r"\|")
+        rx = _SPECIAL[key] = re.compile("|".join(alts))
+    return rx.search
+
+
+def _scan(text, out, cats):
+    """
+    Quét một lượt, không đệ quy, lồng bao nhiêu lớp cũng được. Dấu mở được chép
+    ngay vào out như text thường và ghi lại trên stack; khi gặp dấu đóng tương
+    ứng thì thay đoạn out từ dấu mở: template / bảng -> " ", [[a|b]] -> b,
+    [[a]] -> a. Dấu mở không bao giờ đóng vì thế giữ nguyên là text, và mỗi dấu
+    mở chỉ được xét một lần nên thời gian tuyến tính kể cả với markup hỏng.
+
+    Tên thể loại được thêm vào cats ngay trong lượt này: cat_re được thử ở mỗi
+    '[[', kể cả '[[' nằm trong đoạn bị bỏ (comment, <ref>, thẻ HTML), và bỏ qua
+    vị trí nằm trong match trước, nên kết quả giống cat_re.findall(text).
+    """
+    end = len(text)
+    cat_match, cat_search = cat_re.match, cat_re.search
+    cat_end = 0      # hết match thể loại gần nhất
+    cat_next = None  # kết quả cat_search gần nhất, tìm từ cat_from
+    cat_from = end + 1
+
+    def cat_at(p):
+        nonlocal cat_end
+        if p < cat_end:
+            return True
+        m = cat_match(text, p)
+        if m is None:
+            return False
+        cats.append(m.group(1))
+        cat_end = m.end()
+        return True
+
+    def cats_in(p, q):
+        # các thể loại bắt đầu trong đoạn text[p:q] mà scanner bỏ qua; kết quả
+        # tìm được nhớ lại như ref_close để không tìm lại tới cuối text
+        nonlocal cat_end, cat_next, cat_from
+        p = max(p, cat_end)
+        while True:
+            if cat_from > p or (cat_next is not None and cat_next.start() < p):
+                cat_next = cat_search(text, p)
+                cat_from = p
+            if cat_next is None or cat_next.start() >= q:
+                return
+            cats.append(cat_next.group(1))
+            p = cat_end = cat_next.end()
+
+    # frame đang mở: [loại, vị trí dấu mở trong out, vị trí '|' của link hoặc -1]
+    stack = []
+    braces = []      # loại các frame '{{' / '{|' trong stack, theo thứ tự
+    links = 0        # số frame '[[' trong stack
+    ref_close = None  # kết quả tìm </ref> gần nhất (tránh tìm lại tới cuối text)
+    ref_from = end + 1
+    gt = -2          # vị trí '>' kế tiếp đã tìm (-1: không còn)
+    append = out.append
+    search = _special_re(False, False, False)
+
+    i = 0
+    while True:
+        m = search(text, i)
+        if m is None:
+            append(text[i:])
+            return
+        j = m.start()
+        if j > i:
+            append(text[i:j])
+        tok = m.group()
+        i = m.end()
+
+        if tok == "''":
+            append(" ")
+            continue
+
+        if tok == "[[":
+            # '[[[': tokenizer bỏ qua '[[' bắt đầu ở ký tự thứ hai
+            if not cat_at(j) and text[j + 2:j + 3] == "[":
+                cat_at(j + 1)
+            stack.append(["[[", len(out), -1])
+            links += 1
+            append(tok)
+
+        elif tok == "{{" or tok == "{|":
+            stack.append([tok, len(out), -1])
+            braces.append(tok)
+            append(tok)
+
+        elif tok == "|":
+            stack[-1][2] = len(out)
+            append(tok)
+
+        elif tok == "]]" or tok == "}}" or tok == "|}":
+            want = "[[" if tok == "]]" else "{{" if tok == "}}" else "{|"
+            if want != "[[" and braces[-1] != want:
+                # '}}' trong bảng được giữ như text; '|}' trong '{{a|}}': lùi
+                # một ký tự để còn thấy '}}'
+                if tok == "|}":
+                    tok = "|"
+                    i = j + 1
+                append(tok)
+                continue
+            # bỏ các frame mở bên trên (chúng không đóng, giữ nguyên là text)
+            while True:
+                kind, start, bar = stack.pop()
+                if kind == "[[":
+                    links -= 1
+                else:
+                    braces.pop()
+                if kind == want:
+                    break
+            if want == "[[":
+                # [[a|b]] -> b, [[a]] -> a
+                del out[start:start + 1 if bar < 0 else bar + 1]
+            else:
+                del out[start:]
+                append(" ")
+
+        elif tok == "<!--":
+            k = text.find("-->", i)
+            append(" ")
+            i = end if k < 0 else k + 3
+            cats_in(j, i)
+            continue
+
+        else:  # "<"
+            # thẻ kéo tới '>' kế tiếp; vị trí đó được nhớ để không tìm lại tới
+            # cuối text với mỗi '<' lẻ
+            if gt != -1 and gt < j:
+                gt = text.find(">", j)
+            if (gt > 0 and text[j + 1:j + 4].lower() == "ref"
+                    and not (text[j + 4:j + 5].isalnum() or text[j + 4:j + 5] == "_")):
+                # <ref ...> ... </ref> hoặc <ref .../>
+                i = gt + 1
+                if text[gt - 1] != "/":
+                    if ref_from > i or (ref_close is not None and ref_close.start() < i):
+                        ref_close = REF_CLOSE_RE.search(text, i)
+                        ref_from = i
+                    if ref_close is not None:
+                        i = ref_close.end()
+                append(" ")
+                cats_in(j, i)
+            # thẻ HTML: '<' rồi ít nhất một ký tự trước '>'
+            elif gt > j + 1:
+                append(" ")
+                i = gt + 1
+                cats_in(j, i)
+            else:
+                append(tok)
+            continue
+
+        # stack vừa đổi: chọn lại các dấu cần tìm
+        top = stack[-1] if stack else None
+        search = _special_re(bool(braces), links > 0,
+                             top is not None and top[0] == "[[" and top[2] < 0)
+
+
+def parse_wikitext(text: str):
+    """
+    Một lượt quét tuyến tính: bỏ comment, <ref>, thẻ HTML, template lồng nhau,
+    bảng, rút gọn wiki link, đồng thời lấy thể loại (cả [[Thể loại:...]] nằm
+    trong template / comment, như cat_re trên wikitext gốc trước đây).
+    Trả về (text đã làm sạch, danh sách thể loại đã sắp xếp).
+    """
     if not text:
-        return ""
-    text = re.sub(r"<!--.*?-->", " ", text, flags=re.S)
-    text = re.sub(r"<ref.*?>.*?</ref>", " ", text, flags=re.S | re.I)
-    text = re.sub(r"<ref[^>/]*/?>", " ", text, flags=re.I)
-    text = re.sub(r"</?[^>]+>", " ", text)
-
-    # bỏ template đơn giản (gỡ lớp nông)
-    for _ in range(5):
-        new = re.sub(r"\{\{[^{}]*\}\}", " ", text)
-        if new == text:
-            break
-        text = new
-
-    # wiki links
-    text = re.sub(r"\[\[([^|\]]+)\|([^\]]+)\]\]", r"\2", text)
-    text = re.sub(r"\[\[([^\]]+)\]\]", r"\1", text)
-
-    text = text.replace("''", " ")
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-for line in sys.stdin:
+        return "", []
+    out, found = [], []
+    _scan(text, out, found)
+    cats = {c.strip() for c in found}
+    cats.discard("")
+    return " ".join("".join(out).split()), sorted(cats)
+
+
+def clean_wikitext(text: str) -> str:
+    return parse_wikitext(text)[0]
+
+
+# ---------------- Cache ----------------
+
+# Module mà output phụ thuộc vào, ngoài file này
+RULES_MODULES = (jsoncodec,)
+
+
+def rules_version() -> str:
+    """
+    Hash mã nguồn file này và các module trong RULES_MODULES: sửa quy tắc làm
+    sạch hay cách ghi JSON là cache cũ tự mất hiệu lực.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for path in [__file__] + [m.__file__ for m in RULES_MODULES]:
+        with open(os.path.abspath(path), "rb") as f:
+            h.update(f.read())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+class CleanCache:
+    """
+    Cache output đã làm sạch, khóa (page_id, revision timestamp), lưu trong
+    `<cache_dir>/clean-<rules_version>.sqlite`. cache_dir có thể là thư mục cục
+    bộ dùng chung cho các task trên cùng node, hoặc một bản sao từ HDFS được
+    đưa xuống bằng -archives / -files.
+    """
+
+    def __init__(self, cache_dir: str, commit_every: int = 1000):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"clean-{rules_version()}.sqlite")
+        self.db = sqlite3.connect(self.path, timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS clean ("
+            " page_id TEXT, ts TEXT, out TEXT, PRIMARY KEY (page_id, ts)"
+            ") WITHOUT ROWID"
+        )
+        self.commit_every = commit_every
+        self.pending = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, page_id, ts):
+        row = self.db.execute(
+            "SELECT out FROM clean WHERE page_id = ? AND ts = ?", (page_id, ts)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return row[0]
+
+    def put(self, page_id, ts, out: str):
+        self.db.execute(
+            "INSERT OR REPLACE INTO clean (page_id, ts, out) VALUES (?, ?, ?)",
+            (page_id, ts, out),
+        )
+        self.pending += 1
+        if self.pending >= self.commit_every:
+            self.commit()
+
+    def commit(self):
+        if self.pending:
+            self.db.commit()
+            self.pending = 0
+
+    def report(self):
+        report_cache(self.hits, self.misses)
+
+
+def report_cache(hits, misses):
+    # Hadoop streaming đọc counter từ stderr
+    sys.stderr.write(f"reporter:counter:clean_cache,hits,{hits}\n")
+    sys.stderr.write(f"reporter:counter:clean_cache,misses,{misses}\n")
+
+
+_CACHE = None
+
+
+def open_cache(cache_dir):
+    global _CACHE
+    _CACHE = CleanCache(cache_dir) if cache_dir else None
+
+
+def clean_line(line: str):
+    """Một dòng JSONL raw -> một dòng JSON đã làm sạch (None nếu bỏ qua)."""
     line = line.strip()
     if not line:
-        continue
+        return None
 
     try:
-        doc = json.loads(line)
+        doc = loads(line)
     except Exception:
-        continue
+        return None
 
-    wikitext = doc.get("wikitext", "") or ""
-    categories = sorted({c.strip() for c in cat_re.findall(wikitext) if c.strip()})
+    if _CACHE is not None:
+        key = (str(doc.get("page_id")), str(doc.get("timestamp")))
+        cached = _CACHE.get(*key)
+        if cached is not None:
+            return cached
+
+    text, categories = parse_wikitext(doc.get("wikitext", "") or "")
 
     out = {
         "page_id": doc.get("page_id"),
         "title": doc.get("title"),
         "timestamp": doc.get("timestamp"),
         "categories": categories,
-        "text": clean_wikitext(wikitext),
+        "text": text,
     }
+    out = dumps(out)
+    if _CACHE is not None:
+        _CACHE.put(*key, out)
+    return out
+
+
+def clean_chunk(lines):
+    """Làm sạch một khối; trả về (output, số cache hit, số cache miss của khối)."""
+    if _CACHE is None:
+        return "".join(o + "\n" for o in map(clean_line, lines) if o is not None), 0, 0
+    hits, misses = _CACHE.hits, _CACHE.misses
+    outs = [o for o in map(clean_line, lines) if o is not None]
+    _CACHE.commit()
+    return "".join(o + "\n" for o in outs), _CACHE.hits - hits, _CACHE.misses - misses
+
+
+def iter_chunks(stream, max_lines: int, max_chars: int):
+    """Gom stdin thành từng khối theo số dòng hoặc tổng số ký tự."""
+    chunk, size = [], 0
+    for line in stream:
+        chunk.append(line)
+        size += len(line)
+        if len(chunk) >= max_lines or size >= max_chars:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+def run_pool(workers: int, chunk_lines: int, chunk_mb: float, max_inflight: int,
+             cache_dir: str = None):
+    """
+    Chia các khối input cho process pool, ghi kết quả đúng thứ tự input.
+    Số khối đang xử lý không vượt quá max_inflight nên RAM bị chặn trên bởi
+    khoảng max_inflight * chunk_mb (cả input lẫn output).
+    """
+    max_inflight = max_inflight or workers * 2
+    chunks = iter_chunks(sys.stdin, chunk_lines, int(chunk_mb * 2**20))
+    hits = misses = 0
+
+    def write(future):
+        nonlocal hits, misses
+        out, h, m = future.result()
+        sys.stdout.write(out)
+        hits += h
+        misses += m
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=open_cache,
+                             initargs=(cache_dir,)) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(clean_chunk, chunk))
+            if len(pending) >= max_inflight:
+                write(pending.popleft())
+        while pending:
+            write(pending.popleft())
+    if cache_dir:
+        report_cache(hits, misses)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", type=int, default=1,
+                    help="số process làm sạch song song trong một map task")
+    ap.add_argument("--chunk-lines", type=int, default=256)
+    ap.add_argument("--chunk-mb", type=float, default=4)
+    ap.add_argument("--max-inflight", type=int, default=0,
+                    help="số khối tối đa đang xử lý (mặc định 2 * workers)")
+    ap.add_argument("--cache-dir",
+                    help="thư mục cache output theo (page_id, timestamp, phiên bản quy tắc)")
+    args = ap.parse_args()
+
+    if args.workers > 1:
+        run_pool(args.workers, args.chunk_lines, args.chunk_mb, args.max_inflight,
+                 args.cache_dir)
+        return
+
+    open_cache(args.cache_dir)
+    for line in sys.stdin:
+        out = clean_line(line)
+        if out is not None:
+            sys.stdout.write(out + "\n")
+    if _CACHE is not None:
+        _CACHE.commit()
+        _CACHE.report()
+
 
-    print(json.dumps(out, ensure_ascii=False))
+if __name__ == "__main__":
+    main()
@@ -1,48 +1,125 @@
 #!/usr/bin/env python3
-import sys, json, re, unicodedata
+"""
+Trend keyword theo thời gian, nhiều độ phân giải trong một lần chạy:
+
+    resolution<TAB>period<TAB>keyword<TAB>count      (records.TREND)
+
+    day    2024-03-05
+    week   2024-W10      (tuần ISO 8601)
+    month  2024-03
+    year   2024
+
+Count được cộng dồn trong mapper (combiner.BoundedCounter) nên mỗi document
+không nhân số dòng output lên theo số độ phân giải. Reducer: reducer_sum.py
+hoặc reducer_topk.py (group = resolution + period, cần
+records.TREND.streaming_opts(2)). index_all_data.py tách output theo resolution
+vào các index riêng.
+
+Revision chỉ có tháng (timestamp YYYY-MM) thì chỉ có rollup month / year.
+Hadoop streaming: -files mapper_trend_kwlist.py,kwmatch.py,combiner.py,jsoncodec.py,records.py,keywords.txt
+"""
+import sys, re, argparse, unicodedata
+from datetime import date
+from functools import lru_cache
+
+from combiner import BoundedCounter
+from jsoncodec import loads
+from kwmatch import KeywordMatcher, load_phrases
+from records import FIELD_SEP, TREND
 
 TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
-SEP = "\x01"
+RESOLUTIONS = ("day", "week", "month", "year")
 
 def norm(s: str) -> str:
     return unicodedata.normalize("NFKC", s).casefold()
 
-def month_from_ts(ts: str):
-    return ts[:7] if ts and len(ts) >= 7 else None
+def date_from_ts(ts: str):
+    return ts[:10] if ts and len(ts) >= 7 else None
+
+def periods_of(d: str) -> dict:
+    """d = YYYY-MM-DD hoặc YYYY-MM -> {resolution: period}"""
+    out = {"month": d[:7], "year": d[:4]}
+    if len(d) >= 10:
+        try:
+            y, w, _ = date.fromisoformat(d[:10]).isocalendar()
+        except ValueError:
+            return out
+        out["day"] = d[:10]
+        out["week"] = f"{y}-W{w:02d}"
+    return out
+
+@lru_cache(maxsize=1 << 16)
+def key_prefixes(d: str, resolutions: tuple) -> tuple:
+    per = periods_of(d)
+    return tuple(TREND.key(r, per[r]) + FIELD_SEP for r in resolutions if r in per)
 
 def load_keywords(path="keywords.txt"):
-    ks = set()
-    with open(path, "r", encoding="utf-8-sig") as f:
-        for line in f:
-            w = line.strip()
-            if w:
-                ks.add(norm(w))
-    return ks
+    # keyword có thể là cụm nhiều âm tiết ("dữ liệu"): so khớp trên chuỗi token
+    return KeywordMatcher(load_phrases(path, TOKEN_RE.findall, norm))
 
 KEYS = load_keywords()
 
+def main_tokens(path, resolutions, counts):
+    # Đầu vào là token stream (tokstream.py): khớp keyword trên token id
+    from tokstream import TokenStream, iter_docs
+
+    ts = TokenStream(path)
+    keys = KeywordMatcher(ts.phrase_ids(load_phrases("keywords.txt", TOKEN_RE.findall, norm)))
+    prefixes = [key_prefixes(d, resolutions) for d in ts.dates.items]
+    add = counts.add
+
+    for _, date_id, _, tok_ids in iter_docs(sys.stdin.buffer):
+        if not date_id:
+            continue
+        pres = prefixes[date_id - 1]
+        for k, v in keys.count(tok_ids).items():
+            for pre in pres:
+                add(pre + k, v)
+    counts.flush()
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--resolutions", default=",".join(RESOLUTIONS),
+                    help="các độ phân giải cần ghi, phân cách bằng dấu phẩy")
+    ap.add_argument("--max-mb", type=float, default=64,
+                    help="trần bộ nhớ (ước lượng) của bảng in-mapper combining")
+    ap.add_argument("--tokens", metavar="DIR",
+                    help="đọc token stream nhị phân từ stdin, từ vựng trong DIR")
+    args = ap.parse_args()
+
+    resolutions = tuple(r.strip() for r in args.resolutions.split(",") if r.strip())
+    bad = [r for r in resolutions if r not in RESOLUTIONS]
+    if bad:
+        ap.error(f"resolution không hợp lệ: {', '.join(bad)}")
+
+    counts = BoundedCounter(args.max_mb)
+    if args.tokens:
+        main_tokens(args.tokens, resolutions, counts)
+        return
+
+    add = counts.add
     for line in sys.stdin:
         line = line.strip()
         if not line:
             continue
         try:
-            obj = json.loads(line)
+            obj = loads(line)
         except:
             continue
 
-        m = month_from_ts(obj.get("timestamp") or "")
-        if not m:
+        d = date_from_ts(obj.get("timestamp") or "")
+        if not d:
             continue
 
         text = norm(obj.get("text") or "")
-        cnt = {}
-        for tok in TOKEN_RE.findall(text):
-            if tok in KEYS:
-                cnt[tok] = cnt.get(tok, 0) + 1
+        cnt = KEYS.count(TOKEN_RE.findall(text))
 
+        pres = key_prefixes(d, resolutions)
         for k, v in cnt.items():
-            sys.stdout.write(f"{m}{SEP}{k}\t{v}\n")
+            for pre in pres:
+                add(pre + k, v)
+
+    counts.flush()
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,10 @@
 #!/usr/bin/env python3
-import sys, json, re, unicodedata
+import sys, re, argparse, unicodedata
+from collections import Counter
+from functools import lru_cache
+
+from combiner import BoundedCounter
+from jsoncodec import loads
 
 # Force UTF-8 stdin/stdout/stderr on Windows so Streaming won't crash on non-ASCII tokens
 sys.stdin.reconfigure(encoding="utf-8", errors="replace")
@@ -42,7 +47,9 @@ def load_stopwords(path="stopwords_vi.txt"):
 
 STOP = load_stopwords()
 
-def is_vietnamese_word(tok: str) -> bool:
+def is_vietnamese_word_nfd(tok: str) -> bool:
+    # Bản gốc (NFD + unicodedata cho từng ký tự); giữ làm chuẩn đối chiếu
+    # cho tools/bench_vn_classifier.py
     # basic length guard
     if len(tok) < 2 or len(tok) > 40:
         return False
@@ -83,24 +90,117 @@ def is_vietnamese_word(tok: str) -> bool:
     # This removes most English/Latin names without diacritics.
     return has_vn_mark or has_vn_specific
 
+# ---- Bản tra bảng: cùng quy tắc, nhưng phân loại sẵn theo từng codepoint ----
+
+REJECT, PLAIN, SIGNAL = 0, 1, 2
+
+def _classify_char(ch: str) -> int:
+    # Áp quy tắc của is_vietnamese_word_nfd cho một ký tự. NFD của cả token là
+    # NFD của từng ký tự ghép lại (chỉ khác thứ tự dấu), nên phân loại từng
+    # ký tự cho cùng kết quả.
+    if ch.isdigit():
+        return REJECT
+    cls = PLAIN
+    for c in unicodedata.normalize("NFD", ch):
+        cat = unicodedata.category(c)
+        if cat.startswith("M"):
+            if c not in VN_MARKS:
+                return REJECT
+            cls = SIGNAL
+        elif cat.startswith("L"):
+            if c not in VN_BASE:
+                return REJECT
+            if c == "đ":
+                cls = SIGNAL
+        else:
+            return REJECT
+    return cls
+
+# Mọi ký tự tiếng Việt hợp lệ đều nằm dưới U+2000; codepoint lớn hơn được
+# phân loại khi gặp lần đầu rồi ghi thêm vào bảng.
+CHAR_CLASS = {chr(cp): _classify_char(chr(cp)) for cp in range(0x2000)}
+ALLOWED = {ch for ch, k in CHAR_CLASS.items() if k != REJECT}
+SIGNAL_CHARS = {ch for ch, k in CHAR_CLASS.items() if k == SIGNAL}
+
+@lru_cache(maxsize=1 << 18)
+def is_vietnamese_word(tok: str) -> bool:
+    if len(tok) < 2 or len(tok) > 40:
+        return False
+
+    # đường nhanh: issuperset / isdisjoint duyệt chuỗi ở tầng C
+    if ALLOWED.issuperset(tok):
+        return not SIGNAL_CHARS.isdisjoint(tok)
+
+    has_signal = False
+    for ch in tok:
+        k = CHAR_CLASS.get(ch)
+        if k is None:
+            k = CHAR_CLASS[ch] = _classify_char(ch)
+            if k != REJECT:
+                ALLOWED.add(ch)
+            if k == SIGNAL:
+                SIGNAL_CHARS.add(ch)
+        if k == REJECT:
+            return False
+        if k == SIGNAL:
+            has_signal = True
+    return has_signal
+
+def main_tokens(path, counts):
+    # Đầu vào là token stream (tokstream.py). Token ở đó tách theo [^\W_]+ nên
+    # có thể chứa chữ số; các từ mà TOKEN_RE ở đây tách ra nằm gọn trong một
+    # token đó, nên tính sẵn cho mỗi token id danh sách từ hợp lệ là đủ.
+    from tokstream import TokenStream, iter_docs
+
+    vocab = TokenStream(path).tokens
+    words = []
+    for tok in vocab.items:
+        ws = tuple(w for w in TOKEN_RE.findall(tok)
+                   if w not in STOP and is_vietnamese_word(w))
+        words.append(ws)
+
+    for _, _, _, tok_ids in iter_docs(sys.stdin.buffer):
+        for tid, n in Counter(tok_ids).items():
+            for w in words[tid]:
+                counts.add(w, n)
+    counts.flush()
+
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--max-mb", type=float, default=64,
+                    help="trần bộ nhớ (ước lượng) của bảng in-mapper combining")
+    ap.add_argument("--tokens", metavar="DIR",
+                    help="đọc token stream nhị phân từ stdin, từ vựng trong DIR")
+    args = ap.parse_args()
+
+    counts = BoundedCounter(args.max_mb)
+    if args.tokens:
+        main_tokens(args.tokens, counts)
+        return
+
     for line in sys.stdin:
         line = line.strip()
         if not line:
             continue
 
         try:
-            obj = json.loads(line)
+            obj = loads(line)
         except Exception:
             continue
 
         text = norm(obj.get("text") or "")
+        doc = {}
         for tok in TOKEN_RE.findall(text):
+            doc[tok] = doc.get(tok, 0) + 1
+
+        for tok, n in doc.items():
             if tok in STOP:
                 continue
             if not is_vietnamese_word(tok):
                 continue
-            sys.stdout.write(f"{tok}\t1\n")
+            counts.add(tok, n)
+
+    counts.flush()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+WordCount xấp xỉ (heavy hitters): thay vì ghi count của từng token, mỗi mapper
+giữ một Count-Min Sketch + SpaceSaving top-k (bộ nhớ cố định) và chỉ ghi ra
+một dòng `sketch\t<summary>` khi kết thúc. Gộp bằng reducer_sketch_merge.py:
+
+    hadoop jar hadoop-streaming.jar \\
+      -files mapper_wc_sketch.py,reducer_sketch_merge.py,mapper_wc.py,sketch.py,jsoncodec.py,combiner.py \\
+      -mapper "mapper_wc_sketch.py --k 2000" -reducer "reducer_sketch_merge.py --top 1000" \\
+      -numReduceTasks 1 -input /data/wiki/clean -output /data/wiki/mr/wordcount_topk
+"""
+import sys, argparse
+
+from jsoncodec import loads
+from mapper_wc import TOKEN_RE, STOP, norm, is_vietnamese_word
+from sketch import CountMinSketch, SpaceSaving, dumps_summary
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--width", type=int, default=1 << 16, help="độ rộng Count-Min Sketch")
+    ap.add_argument("--depth", type=int, default=4, help="số hàng Count-Min Sketch")
+    ap.add_argument("--k", type=int, default=2000, help="số key SpaceSaving giữ lại")
+    args = ap.parse_args()
+
+    cms = CountMinSketch(args.width, args.depth)
+    ss = SpaceSaving(args.k)
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            obj = loads(line)
+        except Exception:
+            continue
+
+        doc = {}
+        for tok in TOKEN_RE.findall(norm(obj.get("text") or "")):
+            doc[tok] = doc.get(tok, 0) + 1
+
+        for tok, n in doc.items():
+            if tok in STOP or not is_vietnamese_word(tok):
+                continue
+            cms.add(tok, n)
+            ss.add(tok, n)
+
+    sys.stdout.write(f"sketch\t{dumps_summary(cms, ss)}\n")
+
+if __name__ == "__main__":
+    main()
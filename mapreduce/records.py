@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Định dạng record dùng chung cho mapper, reducer và indexer.
+
+Mỗi record là một dòng, các field phân cách bằng TAB, field cuối là value:
+
+    wordcount     word<TAB>count
+    trend         resolution<TAB>period<TAB>keyword<TAB>count
+    cat_keyword   category<TAB>keyword<TAB>count
+    cat_docs      category<TAB>doc_count
+
+Key là mọi field trước value. Field text không được chứa TAB / xuống dòng
+(clean_field thay bằng khoảng trắng), nên tách field chỉ là một lần split,
+không phải dò keyword hay dùng regex.
+
+Hadoop streaming mặc định coi phần trước TAB đầu tiên là key; với key nhiều
+field phải báo số field của key, và partition theo group để reducer_topk.py
+nhận đủ một group:
+
+    -D stream.num.map.output.key.fields=3 \\
+    -D stream.num.reduce.output.key.fields=3 \\
+    -D mapreduce.partition.keypartitioner.options=-k1,2 \\
+    -partitioner org.apache.hadoop.mapred.lib.KeyFieldBasedPartitioner
+
+(Schema.streaming_opts() sinh đúng các option này; local_runner.py tương ứng là
+--key-fields / --partition-fields.) Gửi kèm file này bằng -files.
+"""
+
+FIELD_SEP = "\t"
+_CLEAN = str.maketrans({"\t": " ", "\n": " ", "\r": " "})
+
+
+def clean_field(s: str) -> str:
+    return s.translate(_CLEAN)
+
+
+class Schema:
+    """Record nhiều field có kiểu; field cuối là value."""
+
+    def __init__(self, name, fields):
+        self.name = name
+        self.fields = tuple(f for f, _ in fields)
+        self.types = tuple(t for _, t in fields)
+        self.key_fields = len(fields) - 1
+        # chỉ convert các field không phải str
+        self._convert = tuple((i, t) for i, t in enumerate(self.types) if t is not str)
+
+    def parse(self, line: str):
+        """Dòng -> tuple giá trị đã đổi kiểu; None nếu sai số field / kiểu."""
+        parts = line.rstrip("\n").split(FIELD_SEP)
+        if len(parts) != len(self.fields):
+            return None
+        try:
+            for i, t in self._convert:
+                parts[i] = t(parts[i])
+        except ValueError:
+            return None
+        return tuple(parts)
+
+    def key(self, *values) -> str:
+        """Key (không có value), vd để cộng dồn trong combiner.BoundedCounter."""
+        return FIELD_SEP.join(map(str, values))
+
+    def format(self, *values) -> str:
+        return FIELD_SEP.join(map(str, values)) + "\n"
+
+    def streaming_opts(self, partition_fields=None):
+        opts = [f"-D stream.num.map.output.key.fields={self.key_fields}",
+                f"-D stream.num.reduce.output.key.fields={self.key_fields}"]
+        if partition_fields:
+            opts += [f"-D mapreduce.partition.keypartitioner.options=-k1,{partition_fields}",
+                     "-partitioner org.apache.hadoop.mapred.lib.KeyFieldBasedPartitioner"]
+        return opts
+
+
+WORDCOUNT = Schema("wordcount", [("word", str), ("count", int)])
+TREND = Schema("trend", [("resolution", str), ("period", str), ("keyword", str), ("count", int)])
+CAT_KEYWORD = Schema("cat_keyword", [("category", str), ("keyword", str), ("count", int)])
+CAT_DOCS = Schema("cat_docs", [("category", str), ("doc_count", int)])
+
+SCHEMAS = {s.name: s for s in (WORDCOUNT, TREND, CAT_KEYWORD, CAT_DOCS)}
+
+
+def split_value(line: str):
+    """
+    'k1<TAB>k2<TAB>v' -> ('k1<TAB>k2', 'v'): tách value ở TAB cuối, key giữ
+    nguyên (reducer_sum.py, reducer_topk.py cộng theo key, không cần tách field).
+    """
+    key, sep, val = line.rstrip("\n").rpartition(FIELD_SEP)
+    return (key, val) if sep and key else None
+
+
+if __name__ == "__main__":
+    # in option Hadoop streaming cho một schema: records.py trend 2
+    import sys
+    schema = SCHEMAS[sys.argv[1]]
+    print(" ".join(schema.streaming_opts(int(sys.argv[2]) if len(sys.argv) > 2 else None)))
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Gộp các summary của mapper_wc_sketch.py và ghi top-N từ:
+
+    word<TAB>count<TAB>err
+
+count là cận trên (min của SpaceSaving và Count-Min), count - err là cận dưới
+chắc chắn của count thật. Dòng cuối `#total<TAB>N<TAB>cms_err` cho biết tổng số
+token và sai số e/width * N của Count-Min Sketch.
+"""
+import sys, argparse
+
+from sketch import loads_summary
+
+# Force UTF-8 for Streaming on Windows
+sys.stdin.reconfigure(encoding="utf-8", errors="replace")
+sys.stdout.reconfigure(encoding="utf-8")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--top", type=int, default=1000)
+    args = ap.parse_args()
+
+    cms = ss = None
+    for line in sys.stdin:
+        line = line.rstrip("\n")
+        if not line:
+            continue
+        _, _, payload = line.partition("\t")
+        try:
+            c, s = loads_summary(payload)
+        except Exception:
+            continue
+        if cms is None:
+            cms, ss = c, s
+        else:
+            cms.merge(c)
+            ss.merge(s)
+
+    if cms is None:
+        return
+
+    rows = []
+    for word, count, err in ss.top(args.top * 2):
+        upper = min(count, cms.estimate(word))
+        lower = max(count - err, 0)
+        rows.append((word, upper, upper - min(lower, upper)))
+    rows.sort(key=lambda r: r[1], reverse=True)
+
+    for word, count, err in rows[:args.top]:
+        sys.stdout.write(f"{word}\t{count}\t{err}\n")
+    sys.stdout.write(f"#total\t{cms.total}\t{cms.error_bound:.0f}\n")
+
+if __name__ == "__main__":
+    main()
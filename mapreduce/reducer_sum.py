@@ -1,29 +1,46 @@
 #!/usr/bin/env python3
-import sys
+import sys, os, argparse, tempfile, hashlib
+
+from records import split_value
 
 # Force UTF-8 for Streaming on Windows
 sys.stdin.reconfigure(encoding="utf-8", errors="replace")
 sys.stdout.reconfigure(encoding="utf-8")
 sys.stderr.reconfigure(encoding="utf-8", errors="replace")
 
-def main():
-    current_key = None
-    current_sum = 0
+# Ước lượng byte cho một entry của bảng hash (slot dict + str + int)
+ENTRY_OVERHEAD = 120
+SPILL_BUCKETS = 64
+# Từ mức đệ quy này trở đi không tràn nữa (bucket đã nhỏ đi 64^n lần)
+MAX_SPILL_LEVEL = 3
 
-    for line in sys.stdin:
-        line = line.rstrip("\n")
-        if not line:
-            continue
+def parse(line):
+    # value là field cuối; key là mọi field trước nó (key nhiều field, records.py)
+    kv = split_value(line)
+    if kv is None:
+        return None
 
-        parts = line.split("\t")
-        if len(parts) < 2:
-            continue
+    try:
+        return kv[0], int(kv[1])
+    except:
+        return None
+
+def bucket_of(key, level):
+    # hash có salt riêng cho từng mức: key dồn chung một bucket ở mức trước
+    # vẫn được chia đều ra các bucket ở mức sau
+    h = hashlib.blake2b(key.encode("utf-8"), digest_size=8, salt=level.to_bytes(8, "little"))
+    return int.from_bytes(h.digest(), "little") % SPILL_BUCKETS
+
+def sorted_sum(lines, out):
+    # input đã được sort/group theo key (chế độ mặc định của Hadoop)
+    current_key = None
+    current_sum = 0
 
-        key = parts[0]
-        try:
-            val = int(parts[1])
-        except:
+    for line in lines:
+        kv = parse(line)
+        if kv is None:
             continue
+        key, val = kv
 
         if current_key is None:
             current_key = key
@@ -31,12 +48,72 @@ def main():
         elif key == current_key:
             current_sum += val
         else:
-            sys.stdout.write(f"{current_key}\t{current_sum}\n")
+            out.write(f"{current_key}\t{current_sum}\n")
             current_key = key
             current_sum = val
 
     if current_key is not None:
-        sys.stdout.write(f"{current_key}\t{current_sum}\n")
+        out.write(f"{current_key}\t{current_sum}\n")
+
+def hash_sum(lines, out, max_bytes, tmp_dir=None, level=0):
+    """
+    Cộng theo bảng hash, không cần input đã sort (dùng làm combiner hoặc reducer
+    khi bỏ pha sort). Bảng vượt max_bytes thì tổng tạm được tràn ra đĩa, chia
+    bucket theo hash của key; mỗi bucket được cộng lại ở cuối (đệ quy với hash
+    khác nếu bucket vẫn quá lớn).
+    """
+    table = {}
+    used = 0
+    buckets = None
+
+    def spill():
+        nonlocal buckets
+        if buckets is None:
+            buckets = [tempfile.TemporaryFile("w+", encoding="utf-8", dir=tmp_dir)
+                       for _ in range(SPILL_BUCKETS)]
+        for key, val in table.items():
+            buckets[bucket_of(key, level)].write(f"{key}\t{val}\n")
+        table.clear()
+
+    for line in lines:
+        kv = parse(line)
+        if kv is None:
+            continue
+        key, val = kv
+        old = table.get(key)
+        if old is None:
+            table[key] = val
+            used += ENTRY_OVERHEAD + len(key)
+            if used > max_bytes and level < MAX_SPILL_LEVEL:
+                spill()
+                used = 0
+        else:
+            table[key] = old + val
+
+    if buckets is None:
+        for key, val in table.items():
+            out.write(f"{key}\t{val}\n")
+        return
+
+    spill()
+    for f in buckets:
+        f.seek(0)
+        hash_sum(f, out, max_bytes, tmp_dir, level + 1)
+        f.close()
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--hash", action="store_true",
+                    help="cộng bằng bảng hash, input không cần sort; output không sort")
+    ap.add_argument("--max-mb", type=float, default=256,
+                    help="trần bộ nhớ bảng hash trước khi tràn ra đĩa (--hash)")
+    ap.add_argument("--tmp", default=os.environ.get("TMPDIR"), help="thư mục tràn (--hash)")
+    args = ap.parse_args()
+
+    if args.hash:
+        hash_sum(sys.stdin, sys.stdout, int(args.max_mb * 2**20), args.tmp)
+    else:
+        sorted_sum(sys.stdin, sys.stdout)
 
 if __name__ == "__main__":
     main()
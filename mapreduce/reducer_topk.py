@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Reducer cho record `group...<TAB>keyword<TAB>count` (records.CAT_KEYWORD,
+records.TREND; group là mọi field trước keyword, vd `month<TAB>2024-03`):
+cộng count theo key như reducer_sum, nhưng mỗi group (danh mục / tháng) chỉ giữ
+K keyword lớn nhất bằng heap, kèm một dòng tổng của group:
+
+    group<TAB>keyword<TAB>count      (tối đa K dòng, count giảm dần)
+    group<TAB>*<TAB>total            (tổng mọi keyword của group)
+
+Output bị chặn bởi số group * (K + 1) thay vì toàn bộ tích group x keyword.
+
+Input phải được sort theo key và cả group phải về cùng một reducer: dùng
+-numReduceTasks 1, hoặc KeyFieldBasedPartitioner trên các field của group
+(records.py); với local_runner.py dùng --key-fields / --partition-fields.
+"""
+import sys, argparse, heapq
+
+from records import FIELD_SEP, split_value
+
+# Force UTF-8 for Streaming on Windows
+sys.stdin.reconfigure(encoding="utf-8", errors="replace")
+sys.stdout.reconfigure(encoding="utf-8")
+sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+
+# keyword của dòng tổng; token keyword chỉ gồm chữ/số nên không trùng
+TOTAL = "*"
+
+def emit_group(group, heap, total):
+    for count, kw in sorted(heap, reverse=True):
+        sys.stdout.write(f"{group}{FIELD_SEP}{kw}\t{count}\n")
+    sys.stdout.write(f"{group}{FIELD_SEP}{TOTAL}\t{total}\n")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=50, help="số keyword giữ lại mỗi group")
+    args = ap.parse_args()
+    k = args.k
+
+    cur_group = None
+    heap = []
+    total = 0
+    cur_key = None
+    cur_sum = 0
+
+    def close_key():
+        nonlocal total
+        group, _, kw = cur_key.rpartition(FIELD_SEP)
+        total += cur_sum
+        if len(heap) < k:
+            heapq.heappush(heap, (cur_sum, kw))
+        elif (cur_sum, kw) > heap[0]:
+            heapq.heapreplace(heap, (cur_sum, kw))
+
+    for line in sys.stdin:
+        # value là field cuối; key còn lại phải có ít nhất group + keyword
+        kv = split_value(line)
+        if kv is None or FIELD_SEP not in kv[0]:
+            continue
+        key, val = kv
+        try:
+            val = int(val)
+        except:
+            continue
+
+        if key == cur_key:
+            cur_sum += val
+            continue
+
+        if cur_key is not None:
+            close_key()
+        group = key.rpartition(FIELD_SEP)[0]
+        if group != cur_group:
+            if cur_group is not None:
+                emit_group(cur_group, heap, total)
+            cur_group, heap, total = group, [], 0
+        cur_key, cur_sum = key, val
+
+    if cur_key is not None:
+        close_key()
+        emit_group(cur_group, heap, total)
+
+if __name__ == "__main__":
+    main()
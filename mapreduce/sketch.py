@@ -0,0 +1,141 @@
+"""
+Tóm tắt xấp xỉ, gộp được (mergeable), dùng cho wordcount heavy-hitters:
+
+- CountMinSketch: ước lượng count của bất kỳ key nào, sai số <= eps * N
+  (eps = e / width) với xác suất >= 1 - e^-depth.
+- SpaceSaving: giữ top-k key; mỗi key có count (cận trên) và err, với
+  count - err <= count thật <= count.
+
+Cả hai đều có bộ nhớ cố định và serialize thành một dòng JSON để mapper ghi ra.
+"""
+import base64
+import hashlib
+import json
+import math
+import zlib
+from array import array
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1 << 18)
+def _hash_pair(key: str):
+    x = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+    return x & 0xFFFFFFFF, (x >> 32) | 1
+
+
+class CountMinSketch:
+    def __init__(self, width: int = 1 << 16, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self.rows = [array("Q", bytes(8 * width)) for _ in range(depth)]
+
+    def add(self, key: str, n: int = 1):
+        h1, h2 = _hash_pair(key)
+        w = self.width
+        for i, row in enumerate(self.rows):
+            row[(h1 + i * h2) % w] += n
+        self.total += n
+
+    def estimate(self, key: str) -> int:
+        h1, h2 = _hash_pair(key)
+        w = self.width
+        return min(row[(h1 + i * h2) % w] for i, row in enumerate(self.rows))
+
+    @property
+    def error_bound(self) -> float:
+        return math.e / self.width * self.total
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("CountMinSketch khác kích thước, không gộp được")
+        for row, orow in zip(self.rows, other.rows):
+            for j, v in enumerate(orow):
+                if v:
+                    row[j] += v
+        self.total += other.total
+
+    def to_dict(self) -> dict:
+        raw = b"".join(row.tobytes() for row in self.rows)
+        return {
+            "width": self.width,
+            "depth": self.depth,
+            "total": self.total,
+            "rows": base64.b64encode(zlib.compress(raw)).decode("ascii"),
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CountMinSketch":
+        cms = cls(d["width"], d["depth"])
+        raw = zlib.decompress(base64.b64decode(d["rows"]))
+        step = 8 * cms.width
+        cms.rows = [array("Q", raw[i * step:(i + 1) * step]) for i in range(cms.depth)]
+        cms.total = d["total"]
+        return cms
+
+
+class SpaceSaving:
+    """
+    SpaceSaving dạng theo lô: cho bảng lớn tới 2k rồi cắt về k key lớn nhất.
+    `floor` là cận trên count thật của mọi key không có trong bảng; key mới vào
+    bảng bắt đầu từ floor (err = floor).
+    """
+
+    def __init__(self, k: int = 1000):
+        self.k = k
+        self.floor = 0
+        self.items = {}  # key -> [count, err]
+
+    def add(self, key: str, n: int = 1):
+        item = self.items.get(key)
+        if item is None:
+            self.items[key] = [self.floor + n, self.floor]
+            if len(self.items) > 2 * self.k:
+                self._prune()
+        else:
+            item[0] += n
+
+    def _prune(self):
+        ranked = sorted(self.items.items(), key=lambda kv: kv[1][0], reverse=True)
+        dropped = ranked[self.k:]
+        if dropped:
+            self.floor = max(self.floor, dropped[0][1][0])
+        self.items = dict(ranked[:self.k])
+
+    def merge(self, other: "SpaceSaving"):
+        merged = {}
+        for key in self.items.keys() | other.items.keys():
+            a = self.items.get(key, [self.floor, self.floor])
+            b = other.items.get(key, [other.floor, other.floor])
+            merged[key] = [a[0] + b[0], a[1] + b[1]]
+        self.items = merged
+        self.floor += other.floor
+        self.k = max(self.k, other.k)
+        if len(self.items) > self.k:
+            self._prune()
+
+    def top(self, n: int):
+        """[(key, count, err)] theo count giảm dần."""
+        ranked = sorted(self.items.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [(key, c, e) for key, (c, e) in ranked[:n]]
+
+    def to_dict(self) -> dict:
+        if len(self.items) > self.k:
+            self._prune()
+        return {"k": self.k, "floor": self.floor, "items": self.items}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "SpaceSaving":
+        ss = cls(d["k"])
+        ss.floor = d["floor"]
+        ss.items = {key: list(v) for key, v in d["items"].items()}
+        return ss
+
+
+def dumps_summary(cms: CountMinSketch, ss: SpaceSaving) -> str:
+    return json.dumps({"cms": cms.to_dict(), "ss": ss.to_dict()}, ensure_ascii=False)
+
+
+def loads_summary(s: str):
+    d = json.loads(s)
+    return CountMinSketch.from_dict(d["cms"]), SpaceSaving.from_dict(d["ss"])
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Token stream: tokenize corpus một lần, lưu dạng nhị phân để mapper_wc,
+mapper_trend_kwlist và mapper_cat_kwlist đếm trên mảng số nguyên thay vì
+chuẩn hóa + regex lại toàn bộ text mỗi lần chạy.
+
+    python mapreduce/tokstream.py -i 'wiki_clean/part-*' -o wiki_tok
+
+Thư mục output:
+    part-NNNNN.tok   mỗi file input một file record nhị phân
+    tokens.txt       từ vựng token (dòng thứ i = token id i)
+    categories.txt   từ vựng danh mục
+    dates.txt        ngày YYYY-MM-DD của revision (date id = dòng + 1, 0 = không có)
+    meta.json        số document / token
+
+Token là kết quả của norm() (NFKC + casefold) rồi regex [^\\W_]+, giống
+mapper_trend_kwlist. Ngày được lưu theo ngày (không chỉ tháng) để các rollup
+theo tuần / tháng / năm đều suy ra được.
+
+Record (little-endian):
+    uint32 page_id, uint32 date_id, uint32 n_cats, uint32 n_tokens,
+    uint32[n_cats] category ids, uint32[n_tokens] token ids
+
+Mapper đọc token stream từ stdin (nhị phân) với --tokens <thư mục vocab>; chạy
+bằng local_runner.py (-i 'wiki_tok/*.tok'), hoặc trên Hadoop với một input
+format đọc nguyên file.
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import struct
+import sys
+import unicodedata
+from array import array
+
+from jsoncodec import loads
+
+TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+HEADER = struct.Struct("<IIII")
+
+
+def norm(s: str) -> str:
+    return unicodedata.normalize("NFKC", s).casefold()
+
+
+def date_from_ts(ts: str):
+    return ts[:10] if ts and len(ts) >= 7 else None
+
+
+def _u32(values) -> bytes:
+    a = array("I", values)
+    if sys.byteorder != "little":
+        a.byteswap()
+    return a.tobytes()
+
+
+class Vocab:
+    def __init__(self, items=()):
+        self.items = list(items)
+        self.ids = {s: i for i, s in enumerate(self.items)}
+
+    def id(self, s: str) -> int:
+        i = self.ids.get(s)
+        if i is None:
+            i = self.ids[s] = len(self.items)
+            self.items.append(s)
+        return i
+
+    def __len__(self):
+        return len(self.items)
+
+    def __getitem__(self, i):
+        return self.items[i]
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            for s in self.items:
+                f.write(s.replace("\n", " ") + "\n")
+
+    @classmethod
+    def load(cls, path: str) -> "Vocab":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(line.rstrip("\n") for line in f)
+
+
+def iter_docs(fp):
+    """Đọc record từ file nhị phân: yield (page_id, date_id, cat_ids, token_ids)."""
+    read = fp.read
+    while True:
+        head = read(HEADER.size)
+        if len(head) < HEADER.size:
+            return
+        page_id, date_id, n_cats, n_tokens = HEADER.unpack(head)
+        ids = array("I")
+        ids.frombytes(read(4 * (n_cats + n_tokens)))
+        if sys.byteorder != "little":
+            ids.byteswap()
+        yield page_id, date_id, ids[:n_cats], ids[n_cats:]
+
+
+class TokenStream:
+    """Từ vựng của một thư mục token stream (dùng trong mapper)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.tokens = Vocab.load(os.path.join(path, "tokens.txt"))
+        self.categories = Vocab.load(os.path.join(path, "categories.txt"))
+        self.dates = Vocab.load(os.path.join(path, "dates.txt"))
+
+    def date(self, date_id: int):
+        return self.dates[date_id - 1] if date_id else None
+
+    def phrase_ids(self, phrases):
+        """Đổi cụm keyword (tuple token) sang tuple token id; bỏ cụm có token lạ."""
+        ids = self.tokens.ids
+        out = []
+        for toks, label in phrases:
+            if all(t in ids for t in toks):
+                out.append((tuple(ids[t] for t in toks), label))
+        return out
+
+
+def build(inputs, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    tokens, cats, dates = Vocab(), Vocab(), Vocab()
+    docs = n_tokens = 0
+
+    for n, path in enumerate(inputs):
+        out_path = os.path.join(out_dir, f"part-{n:05d}.tok")
+        with open(path, "r", encoding="utf-8") as src, open(out_path, "wb") as out:
+            for line in src:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    obj = loads(line)
+                except Exception:
+                    continue
+                try:
+                    page_id = int(obj.get("page_id") or 0)
+                except (TypeError, ValueError):
+                    page_id = 0
+
+                d = date_from_ts(obj.get("timestamp") or "")
+                date_id = dates.id(d) + 1 if d else 0
+                cat_ids = [cats.id(c) for c in (str(c).strip() for c in obj.get("categories") or []) if c]
+                tok_id = tokens.id
+                tok_ids = [tok_id(t) for t in TOKEN_RE.findall(norm(obj.get("text") or ""))]
+
+                out.write(HEADER.pack(page_id, date_id, len(cat_ids), len(tok_ids)))
+                out.write(_u32(cat_ids))
+                out.write(_u32(tok_ids))
+                docs += 1
+                n_tokens += len(tok_ids)
+        print(f"Wrote: {out_path}")
+
+    tokens.save(os.path.join(out_dir, "tokens.txt"))
+    cats.save(os.path.join(out_dir, "categories.txt"))
+    dates.save(os.path.join(out_dir, "dates.txt"))
+    meta = {"docs": docs, "tokens": n_tokens, "vocab": len(tokens),
+            "categories": len(cats), "dates": len(dates)}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Cleaned JSONL -> token stream nhị phân")
+    ap.add_argument("-i", "--input", action="append", required=True,
+                    help="file / glob JSONL output của mapper_clean, lặp lại được")
+    ap.add_argument("-o", "--output", required=True)
+    args = ap.parse_args()
+
+    inputs = sorted({p for pattern in args.input for p in glob.glob(pattern)})
+    print(build(inputs, args.output))
+
+
+if __name__ == "__main__":
+    main()
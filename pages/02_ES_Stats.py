@@ -92,8 +92,11 @@ try:
         # Index health
         st.subheader("Chi tiết Index")
         
+        # wiki_docs là alias: kết quả được key theo tên index thật (wiki_docs-<timestamp>)
         index_info = es.indices.get(index="wiki_docs")
-        settings = index_info['wiki_docs']['settings']['index']
+        concrete_name, concrete_info = next(iter(index_info.items()))
+        settings = concrete_info['settings']['index']
+        st.caption(f"Index: {concrete_name}")
         
         col_info1, col_info2, col_info3 = st.columns(3)
         
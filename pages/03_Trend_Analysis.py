@@ -18,68 +18,149 @@ es = get_es_client()
 
 # Header
 st.title("Phân tích xu hướng từ khóa")
+
+# Độ phân giải -> (index, đơn vị hiển thị, calendar_interval của date_histogram)
+GRANULARITY = {
+    "Ngày": ("wiki_trend_day", "ngày", "day"),
+    "Tuần": ("wiki_trend_week", "tuần", "week"),
+    "Tháng": ("wiki_trend", "tháng", "month"),
+    "Năm": ("wiki_trend_year", "năm", "year"),
+}
+
+granularity = st.radio("Độ phân giải:", list(GRANULARITY), index=2, horizontal=True)
+index_name, unit, interval = GRANULARITY[granularity]
+
 st.markdown("---")
 
+# Bỏ dòng tổng "*" mà reducer_topk.py ghi cho mỗi period
+NOT_TOTAL = {"bool": {"must_not": [{"term": {"total": True}}]}}
+
+# Mọi số liệu được aggregate trên ES (không kéo từng document về), nên theo
+# ngày / tuần nhiều năm cũng không bị cắt ở giới hạn size của search
+SUM_COUNT = {"count": {"sum": {"field": "count"}}}
+
+
+def period_histogram(interval):
+    return {
+        "date_histogram": {"field": "date", "calendar_interval": interval, "min_doc_count": 1},
+        "aggs": SUM_COUNT
+    }
+
+
+def period_label(ts, interval):
+    """Nhãn period giống mapper_trend_kwlist.py (tuần ISO: YYYY-Www)"""
+    if interval == "week":
+        y, w, _ = ts.isocalendar()
+        return f"{y}-W{w:02d}"
+    return ts.strftime({"day": "%Y-%m-%d", "month": "%Y-%m", "year": "%Y"}[interval])
+
+
+def periods_frame(buckets, interval):
+    df = pd.DataFrame({
+        'date': pd.to_datetime([b['key'] for b in buckets], unit='ms'),
+        'count': [int(b['count']['value']) for b in buckets]
+    })
+    df['period'] = [period_label(ts, interval) for ts in df['date']]
+    return df
+
+
 @st.cache_data(ttl=3600)
-def load_trend_data():
-    """Query dữ liệu trend từ Elasticsearch"""
+def load_trend_overview(index_name, interval):
+    """Tổng quan một độ phân giải: số keyword, tổng, top keyword, tổng theo period"""
     try:
         query = {
-            "size": 10000,
-            "_source": ["year", "month", "keyword", "count", "date"],
-            "sort": [{"date": "asc"}]
+            "size": 0,
+            "query": NOT_TOTAL,
+            "aggs": {
+                "keywords": {"cardinality": {"field": "keyword", "precision_threshold": 40000}},
+                "total": {"sum": {"field": "count"}},
+                "top_keywords": {
+                    "terms": {"field": "keyword", "size": 50, "order": {"count": "desc"}},
+                    "aggs": SUM_COUNT
+                },
+                "periods": period_histogram(interval)
+            }
         }
         
-        response = es.search(index="wiki_trend", body=query)
-        
-        data = []
-        for hit in response["hits"]["hits"]:
-            source = hit["_source"]
-            data.append({
-                'month': source['date'],
-                'keyword': source['keyword'],
-                'count': source['count']
-            })
+        response = es.search(index=index_name, body=query)
+        aggs = response["aggregations"]
         
-        if not data:
+        buckets = aggs["top_keywords"]["buckets"]
+        if not buckets:
             return None, "Không có dữ liệu"
         
-        df = pd.DataFrame(data)
-        df['month'] = pd.to_datetime(df['month'])
+        top_keywords = pd.Series(
+            [int(b['count']['value']) for b in buckets],
+            index=pd.Index([b['key'] for b in buckets], name='keyword'),
+            name='count'
+        )
         
-        return df, None
+        return {
+            "keywords": aggs["keywords"]["value"],
+            "total": int(aggs["total"]["value"]),
+            "top_keywords": top_keywords,
+            "periods": periods_frame(aggs["periods"]["buckets"], interval)
+        }, None
         
     except Exception as e:
         return None, str(e)
 
+
+@st.cache_data(ttl=3600)
+def load_keyword_trend(index_name, interval, keywords):
+    """Chuỗi theo period của các keyword đã chọn"""
+    query = {
+        "size": 0,
+        "query": {"bool": {"filter": [{"terms": {"keyword": list(keywords)}}]}},
+        "aggs": {
+            "by_keyword": {
+                "terms": {"field": "keyword", "size": len(keywords)},
+                "aggs": {"periods": period_histogram(interval)}
+            }
+        }
+    }
+    
+    response = es.search(index=index_name, body=query)
+    
+    frames = []
+    for bucket in response["aggregations"]["by_keyword"]["buckets"]:
+        df = periods_frame(bucket["periods"]["buckets"], interval)
+        df['keyword'] = bucket['key']
+        frames.append(df)
+    
+    if not frames:
+        return pd.DataFrame(columns=['period', 'date', 'keyword', 'count'])
+    return pd.concat(frames, ignore_index=True)[['period', 'date', 'keyword', 'count']]
+
 # Load data
 with st.spinner("Đang tải dữ liệu..."):
-    df_trend, error = load_trend_data()
+    overview, error = load_trend_overview(index_name, interval)
 
 if error:
     st.error(f"Lỗi: {error}")
     st.info("Đảm bảo đã chạy: `python elasticsearch/index_all_data.py`")
-elif df_trend is not None and len(df_trend) > 0:
+elif overview is not None:
+    period_total = overview["periods"]
     
     # Overview metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Tổng từ khóa", f"{df_trend['keyword'].nunique():,}")
+        st.metric("Tổng từ khóa", f"{overview['keywords']:,}")
     with col2:
-        st.metric("Số tháng", f"{df_trend['month'].nunique()}")
+        st.metric(f"Số {unit}", f"{len(period_total)}")
     with col3:
-        st.metric("Tổng xuất hiện", f"{df_trend['count'].sum():,}")
+        st.metric("Tổng xuất hiện", f"{overview['total']:,}")
     with col4:
-        avg = df_trend.groupby('month')['count'].sum().mean()
-        st.metric("TB/tháng", f"{avg:,.0f}")
+        avg = period_total['count'].mean()
+        st.metric(f"TB/{unit}", f"{avg:,.0f}")
     
     st.markdown("---")
     
     # Top keywords
     st.subheader("Top 20 từ khóa phổ biến nhất")
     
-    top_keywords = df_trend.groupby('keyword')['count'].sum().sort_values(ascending=False).head(20)
+    top_keywords = overview["top_keywords"].head(20)
     
     col_chart1, col_chart2 = st.columns([2, 1])
     
@@ -98,7 +179,7 @@ elif df_trend is not None and len(df_trend) > 0:
     # Keyword comparison
     st.subheader("So sánh xu hướng từ khóa")
     
-    available_keywords = top_keywords.head(50).index.tolist()
+    available_keywords = overview["top_keywords"].index.tolist()
     
     col_filter1, col_filter2 = st.columns([3, 1])
     
@@ -114,10 +195,14 @@ elif df_trend is not None and len(df_trend) > 0:
         chart_type = st.radio("Loại biểu đồ:", ["Line", "Area"], horizontal=True)
     
     if selected_keywords:
-        df_selected = df_trend[df_trend['keyword'].isin(selected_keywords)]
+        try:
+            df_selected = load_keyword_trend(index_name, interval, tuple(selected_keywords))
+        except Exception as e:
+            st.error(f"Lỗi: {e}")
+            st.stop()
         
         df_pivot = df_selected.pivot_table(
-            index='month',
+            index='date',
             columns='keyword',
             values='count',
             fill_value=0
@@ -136,7 +221,7 @@ elif df_trend is not None and len(df_trend) > 0:
         cols = st.columns(len(selected_keywords))
         
         for idx, keyword in enumerate(selected_keywords):
-            df_kw = df_selected[df_selected['keyword'] == keyword].sort_values('month')
+            df_kw = df_selected[df_selected['keyword'] == keyword].sort_values('date')
             
             with cols[idx]:
                 st.markdown(f"**{keyword}**")
@@ -145,11 +230,11 @@ elif df_trend is not None and len(df_trend) > 0:
                 st.metric("Tổng", f"{total:,}")
                 
                 avg = df_kw['count'].mean()
-                st.metric("TB/tháng", f"{avg:.0f}")
+                st.metric(f"TB/{unit}", f"{avg:.0f}")
                 
                 max_val = df_kw['count'].max()
-                max_month = df_kw[df_kw['count'] == max_val].iloc[0]['month'].strftime('%Y-%m')
-                st.metric("Cao nhất", f"{max_val:,}", delta=f"{max_month}")
+                max_period = df_kw[df_kw['count'] == max_val].iloc[0]['period']
+                st.metric("Cao nhất", f"{max_val:,}", delta=f"{max_period}")
                 
                 # Growth indicator
                 if len(df_kw) >= 2:
@@ -169,11 +254,9 @@ elif df_trend is not None and len(df_trend) > 0:
         # Data table
         st.subheader("Bảng dữ liệu")
         
-        df_display = df_selected.copy()
-        df_display['month'] = df_display['month'].dt.strftime('%Y-%m')
-        df_display = df_display.sort_values(['keyword', 'month'])
+        df_display = df_selected.sort_values(['keyword', 'date']).drop(columns=['date'])
         df_display = df_display.rename(columns={
-            'month': 'Tháng',
+            'period': unit.capitalize(),
             'keyword': 'Từ khóa',
             'count': 'Số lần'
         })
@@ -185,7 +268,7 @@ elif df_trend is not None and len(df_trend) > 0:
         st.download_button(
             "Tải CSV",
             csv,
-            f"trend_{'-'.join(selected_keywords[:3])}.csv",
+            f"trend_{index_name}_{'-'.join(selected_keywords[:3])}.csv",
             "text/csv"
         )
     else:
@@ -193,18 +276,15 @@ elif df_trend is not None and len(df_trend) > 0:
     
     st.markdown("---")
     
-    # Monthly activity
-    st.subheader("Hoạt động theo tháng")
-    
-    monthly_total = df_trend.groupby('month')['count'].sum().reset_index()
-    monthly_total['month_str'] = monthly_total['month'].dt.strftime('%Y-%m')
+    # Activity per period
+    st.subheader(f"Hoạt động theo {unit}")
     
-    st.bar_chart(monthly_total.set_index('month')['count'], height=250)
+    st.bar_chart(period_total.set_index('date')['count'], height=250)
     
-    top_months = monthly_total.nlargest(5, 'count')
+    top_periods = period_total.nlargest(5, 'count')
     
-    st.markdown("**Top 5 tháng hoạt động nhất:**")
-    for idx, row in top_months.iterrows():
-        st.text(f"  {row['month_str']}: {row['count']:,} lượt")
+    st.markdown(f"**Top 5 {unit} hoạt động nhất:**")
+    for idx, row in top_periods.iterrows():
+        st.text(f"  {row['period']}: {row['count']:,} lượt")
 else:
     st.info("Chưa có dữ liệu. Chạy `python elasticsearch/index_all_data.py`")
@@ -105,12 +105,17 @@ with tab2:
     st.header("Keywords by Category")
     st.markdown("Phân tích từ khóa công nghệ xuất hiện trong các danh mục")
     
+    # Dòng tổng "<category>\t*" của reducer_topk.py lớn hơn mọi keyword trong
+    # danh mục, nên phải tách khỏi query keyword (nếu không sẽ chiếm hết size)
+    TOTAL_ROWS = {"term": {"total": True}}
+    
     @st.cache_data(ttl=3600)
     def load_category_keywords():
         try:
             query = {
                 "size": 10000,
                 "_source": ["category", "keyword", "count"],
+                "query": {"bool": {"must_not": [TOTAL_ROWS]}},
                 "sort": [{"count": "desc"}]
             }
             response = es.search(index="wiki_cat_kwlist", body=query)
@@ -129,8 +134,46 @@ with tab2:
         except Exception as e:
             return None, str(e)
     
+    @st.cache_data(ttl=3600)
+    def load_category_totals(top_n=20):
+        """Tổng xuất hiện (mọi danh mục) và top danh mục theo dòng tổng, aggregate trên ES"""
+        try:
+            query = {
+                "size": 0,
+                "query": {"bool": {"filter": [TOTAL_ROWS]}},
+                "aggs": {
+                    "total": {"sum": {"field": "count"}},
+                    "top_categories": {
+                        "terms": {"field": "category", "size": top_n, "order": {"count": "desc"}},
+                        "aggs": {"count": {"sum": {"field": "count"}}}
+                    }
+                }
+            }
+            aggs = es.search(index="wiki_cat_kwlist", body=query)["aggregations"]
+            buckets = aggs["top_categories"]["buckets"]
+            if not buckets:
+                return None, None
+            top = pd.Series({b['key']: int(b['count']['value']) for b in buckets}, dtype='int64')
+            return int(aggs["total"]["value"]), top
+        except Exception:
+            return None, None
+    
+    @st.cache_data(ttl=3600)
+    def load_category_total(category):
+        try:
+            query = {
+                "size": 1,
+                "_source": ["count"],
+                "query": {"bool": {"filter": [TOTAL_ROWS, {"term": {"category": category}}]}}
+            }
+            hits = es.search(index="wiki_cat_kwlist", body=query)["hits"]["hits"]
+            return hits[0]["_source"]["count"] if hits else None
+        except Exception:
+            return None
+    
     with st.spinner("Loading category keywords data..."):
         df_kw, error_kw = load_category_keywords()
+        total_kw, cat_activity = load_category_totals()
     
     if error_kw:
         st.error(f"Lỗi: {error_kw}")
@@ -143,7 +186,9 @@ with tab2:
         with col2:
             st.metric("Từ khóa unique", f"{df_kw['keyword'].nunique()}")
         with col3:
-            st.metric("Tổng xuất hiện", f"{df_kw['count'].sum():,}")
+            if total_kw is None:
+                total_kw = df_kw['count'].sum()
+            st.metric("Tổng xuất hiện", f"{int(total_kw):,}")
         
         st.markdown("---")
         
@@ -169,7 +214,8 @@ with tab2:
         # === SECTION 2: Top Categories by Keyword Activity ===
         st.subheader("Danh mục hoạt động nhất")
         
-        cat_activity = df_kw.groupby('category')['count'].sum().sort_values(ascending=False).head(20)
+        if cat_activity is None:
+            cat_activity = df_kw.groupby('category')['count'].sum().sort_values(ascending=False).head(20)
         
         st.bar_chart(cat_activity, height=400)
         
@@ -198,7 +244,10 @@ with tab2:
             with col_m2:
                 st.metric("Từ khóa tìm thấy", len(df_cat))
             with col_m3:
-                st.metric("Tổng xuất hiện", df_cat['count'].sum())
+                cat_total = load_category_total(selected_cat)
+                if cat_total is None:
+                    cat_total = df_cat['count'].sum()
+                st.metric("Tổng xuất hiện", int(cat_total))
             
             # Chart
             df_cat_top = df_cat.head(top_n_kw)
@@ -43,7 +43,7 @@ st.markdown("""
 │  ┌──────────────────────────┐   │
 │  │ wiki_docs                │   │ ← Documents gốc
 │  │ wiki_wordcount           │   │ ← Tần suất từ khóa
-│  │ wiki_trend               │   │ ← Xu hướng theo thời gian
+│  │ wiki_trend[_day/_week/..]│   │ ← Xu hướng theo thời gian
 │  │ wiki_cat_kwlist          │   │ ← Từ khóa theo danh mục
 │  │ wiki_cat_docs            │   │ ← Documents theo danh mục
 │  └──────────────────────────┘   │
@@ -68,13 +68,13 @@ st.markdown("""
 - Output: `word \\t count`
 
 **3. Trend Analysis (`mapper_trend_kwlist.py`)**
-- Phân tích xu hướng từ khóa theo thời gian
-- Format: `YYYY-MM-keyword`
-- Output: `date-keyword \\t count`
+- Phân tích xu hướng từ khóa theo ngày / tuần ISO / tháng / năm trong một job
+- Key: `resolution, period, keyword` (vd `week`, `2024-W10`, `internet`)
+- Output: `resolution \\t period \\t keyword \\t count`, mỗi resolution một index
 
 **4. Category Keywords (`mapper_cat_kwlist.py`)**
 - Từ khóa trong mỗi danh mục
-- Output: `category-keyword \\t count`
+- Output: `category \\t keyword \\t count`
 
 **5. Category Docs (`mapper_cat_docs.py`)**
 - Số lượng documents theo danh mục
@@ -100,37 +100,87 @@ st.markdown("""
 
 1. **Download Wikipedia dump**
    ```bash
-   wget https://dumps.wikimedia.org/viwiki/latest/viwiki-latest-pages-articles.xml.bz2
+   wget https://dumps.wikimedia.org/viwiki/latest/viwiki-latest-pages-articles-multistream.xml.bz2
+   wget https://dumps.wikimedia.org/viwiki/latest/viwiki-latest-pages-articles-multistream-index.txt.bz2
    ```
 
-2. **Upload to HDFS**
+2. **Convert & upload to HDFS**
    ```bash
-   hdfs dfs -put viwiki-latest-pages-articles.xml /data/wiki/raw/
+   python tools/xml2jsonl_raw.py viwiki-latest-pages-articles-multistream.xml.bz2 \\
+     -o wiki_raw --workers 8 --compression bz2 --shard-size-mb 256
+   hdfs dfs -put wiki_raw/*.jsonl.bz2 /data/wiki/raw/
    ```
 
 3. **Run MapReduce jobs**
    ```bash
    # Clean data
    hadoop jar hadoop-streaming.jar \\
+     -files mapper_clean.py,jsoncodec.py \\
      -mapper mapper_clean.py \\
      -input /data/wiki/raw \\
      -output /data/wiki/clean
    
    # WordCount
    hadoop jar hadoop-streaming.jar \\
+     -files mapper_wc.py,reducer_sum.py,combiner.py,jsoncodec.py,records.py,stopwords_vi.txt \\
      -mapper mapper_wc.py \\
      -reducer reducer_sum.py \\
      -input /data/wiki/clean \\
      -output /data/wiki/mr/wordcount
    
-   # Trend analysis, category analysis...
+   # Trend analysis: key 3 field, partition theo (resolution, period)
+   # (python mapreduce/records.py trend 2 in ra các option -D)
+   hadoop jar hadoop-streaming.jar \\
+     -D stream.num.map.output.key.fields=3 \\
+     -D stream.num.reduce.output.key.fields=3 \\
+     -D mapreduce.partition.keypartitioner.options=-k1,2 \\
+     -partitioner org.apache.hadoop.mapred.lib.KeyFieldBasedPartitioner \\
+     -files mapper_trend_kwlist.py,reducer_topk.py,kwmatch.py,combiner.py,jsoncodec.py,records.py,keywords.txt \\
+     -mapper mapper_trend_kwlist.py \\
+     -reducer reducer_topk.py \\
+     -input /data/wiki/clean \\
+     -output /data/wiki/mr/trend
+   
+   # Category keyword: key 2 field (category, keyword), partition theo category
+   # để reducer_topk.py nhận đủ một danh mục (python mapreduce/records.py cat_keyword 1)
+   hadoop jar hadoop-streaming.jar \\
+     -D stream.num.map.output.key.fields=2 \\
+     -D stream.num.reduce.output.key.fields=2 \\
+     -D mapreduce.partition.keypartitioner.options=-k1,1 \\
+     -partitioner org.apache.hadoop.mapred.lib.KeyFieldBasedPartitioner \\
+     -files mapper_cat_kwlist.py,reducer_topk.py,kwmatch.py,jsoncodec.py,records.py,keywords.txt \\
+     -mapper mapper_cat_kwlist.py \\
+     -reducer reducer_topk.py \\
+     -input /data/wiki/clean \\
+     -output /data/wiki/mr/category_keyword
+   
+   # Số document theo danh mục: key 1 field, không cần option -D
+   hadoop jar hadoop-streaming.jar \\
+     -files mapper_cat_docs.py,reducer_sum.py,jsoncodec.py,records.py \\
+     -mapper mapper_cat_docs.py \\
+     -reducer reducer_sum.py \\
+     -input /data/wiki/clean \\
+     -output /data/wiki/mr/category_stats
+   
+   # Chạy thử trên một máy: local_runner.py nhận số field của key / partition
+   # tương ứng các option -D ở trên
+   python mapreduce/local_runner.py -i wiki_clean.jsonl -o out_cat \\
+     -m mapper_cat_kwlist.py -r reducer_topk.py --reducers 4 \\
+     --key-fields 2 --partition-fields 1
    ```
 
 4. **Index to Elasticsearch**
    ```bash
    python elasticsearch/create_index.py
    python elasticsearch/ingest_wiki_docs.py
-   python elasticsearch/index_all_data.py
+   python elasticsearch/index_all_data.py --threads 8 --chunk-docs 1000 --chunk-mb 10 \\
+     --bulk-load --merge-segments 1
+   # mỗi lần build ghi vào <alias>-<timestamp>, alias chỉ chuyển khi số docs khớp;
+   # quay lại thế hệ trước:
+   python elasticsearch/index_all_data.py --rollback
+   # cập nhật hằng đêm: chỉ upsert document mới/đã đổi (content_hash), xóa tombstone
+   python elasticsearch/index_all_data.py --incremental \\
+     --docs '/data/wiki/clean/delta/part-*' --tombstones wiki_raw/deleted.txt
    ```
 
 5. **Launch Streamlit UI**
@@ -167,7 +217,8 @@ Name: {info['name']}
 with col2:
     st.info("**Indices Status**")
     
-    indices = ["wiki_docs", "wiki_wordcount", "wiki_trend", "wiki_cat_kwlist", "wiki_cat_docs"]
+    indices = ["wiki_docs", "wiki_wordcount", "wiki_trend", "wiki_trend_day", "wiki_trend_week",
+               "wiki_trend_year", "wiki_cat_kwlist", "wiki_cat_docs"]
     
     for idx in indices:
         try:
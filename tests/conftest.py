@@ -0,0 +1,26 @@
+import importlib
+import io
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for sub in ("mapreduce", "tools", "elasticsearch"):
+    sys.path.insert(0, os.path.join(ROOT, sub))
+
+
+@pytest.fixture
+def load_script(monkeypatch):
+    """
+    Import một script streaming (mapper/reducer). Các script gọi
+    sys.stdin.reconfigure() lúc import, mà stdin của pytest không hỗ trợ, nên
+    thay tạm stdio bằng TextIOWrapper rỗng.
+    """
+    def load(name):
+        with monkeypatch.context() as mp:
+            for stream in ("stdin", "stdout", "stderr"):
+                mp.setattr(sys, stream, io.TextIOWrapper(io.BytesIO(), encoding="utf-8"))
+            sys.modules.pop(name, None)
+            return importlib.import_module(name)
+    return load
@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+pytest.importorskip("elastic_transport")
+from elastic_transport import ConnectionTimeout  # noqa: E402
+
+from bulk_pipeline import ParallelBulk  # noqa: E402
+
+
+class TimeoutOnceES:
+    """Ghi mọi chunk nhưng lần gọi đầu tiên timeout sau khi đã ghi."""
+
+    def __init__(self):
+        self.docs = []
+        self.calls = 0
+
+    def bulk(self, operations):
+        self.calls += 1
+        lines = operations.decode("utf-8").splitlines()
+        items = []
+        for meta, source in zip(lines[::2], lines[1::2]):
+            (op, meta), = json.loads(meta).items()
+            self.docs.append((meta.get("_id"), json.loads(source)))
+            items.append({op: {"status": 201, "result": "created"}})
+        if self.calls == 1:
+            raise ConnectionTimeout("timed out")
+        return {"errors": False, "items": items}
+
+
+def test_ambiguous_failure_resends_only_actions_with_id():
+    es = TimeoutOnceES()
+    actions = [{"_index": "i", "_id": "a", "_source": {"n": 1}},
+               {"_index": "i", "_source": {"n": 2}}]
+    success, failed = ParallelBulk(es, backoff=0).run(actions)
+    assert (success, failed) == (1, 1)
+    # action tự sinh id không được gửi lại
+    assert [d for d in es.docs if d[0] is None] == [(None, {"n": 2})]
@@ -0,0 +1,249 @@
+import fnmatch
+import json
+
+import pytest
+
+pytest.importorskip("elastic_transport")
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig  # noqa: E402
+from elasticsearch import NotFoundError  # noqa: E402
+
+
+def not_found(msg):
+    meta = ApiResponseMeta(status=404, http_version="1.1", headers=HttpHeaders(), duration=0.0,
+                           node=NodeConfig("http", "localhost", 9200))
+    return NotFoundError(msg, meta, {})
+
+
+class FakeIndices:
+    def __init__(self, es):
+        self.es = es
+
+    def exists(self, index):
+        return index in self.es.store or index in self.es.aliases
+
+    def create(self, index, body=None):
+        assert index not in self.es.store
+        self.es.store[index] = {}
+
+    def delete(self, index):
+        del self.es.store[index]
+
+    def get(self, index):
+        return {n: {} for n in self.es.store if fnmatch.fnmatch(n, index)}
+
+    def get_alias(self, name):
+        targets = self.es.aliases.get(name)
+        if not targets:
+            raise not_found(name)
+        return {i: {"aliases": {name: {}}} for i in targets}
+
+    def update_aliases(self, actions):
+        # áp dụng cả lô một lần như ES (atomic)
+        aliases = {a: set(s) for a, s in self.es.aliases.items()}
+        for action in actions:
+            (op, arg), = action.items()
+            if op == "add":
+                aliases.setdefault(arg["alias"], set()).add(arg["index"])
+            elif op == "remove":
+                aliases[arg["alias"]].remove(arg["index"])
+            elif op == "remove_index":
+                del self.es.store[arg["index"]]
+        self.es.aliases = {a: s for a, s in aliases.items() if s}
+
+    def refresh(self, index):
+        pass
+
+    def put_settings(self, index, settings):
+        pass
+
+    def forcemerge(self, index, max_num_segments):
+        pass
+
+
+class FakeES:
+    """Phần API Elasticsearch mà index_all_data.py / bulk_pipeline.py dùng."""
+
+    def __init__(self):
+        self.store = {}
+        self.aliases = {}
+        self.indices = FakeIndices(self)
+        self.reject = set()  # _id bị từ chối (lỗi mapping)
+
+    def options(self, **kw):
+        return self
+
+    def _resolve(self, index):
+        if index in self.aliases:
+            (index,) = self.aliases[index]
+        if index not in self.store:
+            raise not_found(index)
+        return self.store[index]
+
+    def count(self, index):
+        return {"count": len(self._resolve(index))}
+
+    def mget(self, index, ids, source_includes=None):
+        docs = self._resolve(index)
+        return {"docs": [
+            {"_id": i, "found": True, "_source": {k: docs[i].get(k) for k in source_includes}}
+            if i in docs else {"_id": i, "found": False}
+            for i in ids
+        ]}
+
+    def bulk(self, operations):
+        lines = operations.decode("utf-8").splitlines()
+        items = []
+        i = 0
+        while i < len(lines):
+            (op, meta), = json.loads(lines[i]).items()
+            i += 1
+            docs = self._resolve(meta["_index"])
+            _id = meta.get("_id") or str(len(docs))
+            if op == "delete":
+                found = docs.pop(_id, None) is not None
+                items.append({op: {"status": 200 if found else 404,
+                                   "result": "deleted" if found else "not_found"}})
+                continue
+            body = json.loads(lines[i])
+            i += 1
+            if _id in self.reject:
+                items.append({op: {"status": 400, "error": {"type": "mapper_parsing_exception"}}})
+            elif op == "update":
+                if _id in docs:
+                    old = dict(docs[_id])
+                    docs[_id].update(body["doc"])
+                    items.append({op: {"status": 200,
+                                       "result": "noop" if old == docs[_id] else "updated"}})
+                else:
+                    docs[_id] = dict(body["doc"])
+                    items.append({op: {"status": 201, "result": "created"}})
+            else:
+                created = _id not in docs
+                docs[_id] = body
+                items.append({op: {"status": 201 if created else 200,
+                                   "result": "created" if created else "updated"}})
+        return {"errors": False, "items": items}
+
+
+@pytest.fixture
+def iad(monkeypatch):
+    """index_all_data với ES giả; iad.files: đường dẫn HDFS -> các dòng."""
+    import index_all_data
+
+    files = {}
+    monkeypatch.setattr(index_all_data, "es", FakeES())
+    monkeypatch.setattr(index_all_data, "UNPUBLISHED", [])
+    monkeypatch.setattr(index_all_data, "hdfs_lines", lambda path: iter(files.get(path, [])))
+    monkeypatch.setattr(index_all_data, "files", files, raising=False)
+    return index_all_data
+
+
+def build(iad, monkeypatch, build_id, words):
+    monkeypatch.setattr(iad, "BUILD_ID", build_id)
+    iad.files["/data/wiki/mr/wordcount/part-*"] = [f"{w}\t{n}\n" for w, n in words]
+    iad.index_wordcount()
+    return f"wiki_wordcount-{build_id}"
+
+
+def test_alias_swap_rollback_and_pruning(iad, monkeypatch):
+    es = iad.es
+    first = build(iad, monkeypatch, "20240101000000", [("a", 1), ("b", 2)])
+    assert es.aliases["wiki_wordcount"] == {first}
+    assert es.count(index="wiki_wordcount")["count"] == 2
+
+    second = build(iad, monkeypatch, "20240102000000", [("a", 1), ("b", 2), ("c", 3)])
+    assert es.aliases["wiki_wordcount"] == {second}
+    assert first in es.store  # thế hệ trước được giữ để rollback
+
+    third = build(iad, monkeypatch, "20240103000000", [("d", 4)])
+    assert es.aliases["wiki_wordcount"] == {third}
+    assert sorted(es.store) == [second, third]
+
+    assert iad.rollback("wiki_wordcount")
+    assert es.aliases["wiki_wordcount"] == {second}
+
+
+def test_empty_or_failed_build_is_not_published(iad, monkeypatch):
+    es = iad.es
+    first = build(iad, monkeypatch, "20240101000000", [("a", 1)])
+    empty = build(iad, monkeypatch, "20240102000000", [])
+    assert es.aliases["wiki_wordcount"] == {first}
+    assert iad.UNPUBLISHED == [empty]
+
+    es.reject = {iad.record_id(iad.WORDCOUNT, "a")}
+    failed = build(iad, monkeypatch, "20240103000000", [("a", 1), ("b", 2)])
+    assert es.aliases["wiki_wordcount"] == {first}
+    assert iad.UNPUBLISHED == [empty, failed]
+
+
+def test_legacy_concrete_index_replaced_by_alias(iad, monkeypatch):
+    iad.es.store["wiki_wordcount"] = {"x": {}}
+    new = build(iad, monkeypatch, "20240101000000", [("a", 1)])
+    assert "wiki_wordcount" not in iad.es.store
+    assert iad.es.aliases["wiki_wordcount"] == {new}
+
+
+def test_trend_skips_resolutions_without_input(iad, monkeypatch):
+    monkeypatch.setattr(iad, "BUILD_ID", "20240101000000")
+    iad.files["/data/wiki/mr/trend/part-*"] = [
+        "month\t2024-01\tviệt nam\t3\n",
+        "month\t2024-01\t*\t5\n",
+        "year\t2024\tviệt nam\t3\n",
+    ]
+    iad.index_trend_kwlist()
+    assert sorted(iad.es.aliases) == ["wiki_trend", "wiki_trend_year"]
+    assert sorted(iad.es.store) == ["wiki_trend-20240101000000", "wiki_trend_year-20240101000000"]
+    assert iad.UNPUBLISHED == []
+
+
+def test_resend_after_timeout_does_not_duplicate(iad, monkeypatch):
+    from elastic_transport import ConnectionTimeout
+
+    es = iad.es
+    bulk = es.bulk
+    calls = {"n": 0}
+
+    def flaky_bulk(operations):
+        # lần đầu ES đã ghi chunk nhưng client timeout trước khi nhận response
+        calls["n"] += 1
+        resp = bulk(operations)
+        if calls["n"] == 1:
+            raise ConnectionTimeout("timed out")
+        return resp
+
+    monkeypatch.setattr(es, "bulk", flaky_bulk)
+    monkeypatch.setitem(iad.BULK_OPTS, "backoff", 0)
+    first = build(iad, monkeypatch, "20240101000000", [("a", 1), ("b", 2)])
+    assert calls["n"] == 2
+    assert es.count(index=first)["count"] == 2
+    assert es.aliases["wiki_wordcount"] == {first}
+
+
+def doc_line(page_id, text):
+    return json.dumps({"page_id": page_id, "title": f"T{page_id}", "timestamp": "2024-01-01",
+                       "categories": [], "text": text}, ensure_ascii=False) + "\n"
+
+
+def test_incremental_counts_come_from_bulk_results(iad, monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(iad, "BUILD_ID", "20240101000000")
+    iad.files[iad.WIKI_DOCS_PATH] = [doc_line(str(i), "cũ") for i in range(10)]
+    iad.index_wiki_docs()
+    index_name = "wiki_docs-20240101000000"
+    assert iad.es.count(index="wiki_docs")["count"] == 10
+
+    iad.files["/inc"] = ([doc_line(str(i), "cũ") for i in range(6)]
+                         + [doc_line(str(i), "mới") for i in range(6, 10)]
+                         + [doc_line("10", "mới"), doc_line("11", "mới")])
+    tombstones = tmp_path / "deleted.txt"
+    tombstones.write_text("0\n1\nkhông-có\n")
+    iad.es.reject = {"9", "11"}
+    capsys.readouterr()
+
+    failed = iad.update_wiki_docs("/inc", str(tombstones))
+    out = capsys.readouterr().out
+    assert failed == 2
+    assert "unchanged 6  inserted 1  updated 3  deleted 2  noop/not_found 1" in out
+    assert "failed 2" in out
+    docs = iad.es.store[index_name]
+    assert sorted(docs, key=int) == [str(i) for i in range(2, 11)]
+    assert docs["8"]["text"] == "mới" and docs["9"]["text"] == "cũ"
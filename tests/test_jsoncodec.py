@@ -0,0 +1,47 @@
+import importlib
+import json
+
+import pytest
+
+import jsoncodec
+
+DOC = {
+    "page_id": "1",
+    "title": "Việt Nam / Hà Nội",
+    "categories": ["Quốc gia", "Đông Nam Á"],
+    "text": 'a "b" \\ c\td\n',
+    "n": 3,
+    "x": 1.5,
+    "ok": True,
+    "none": None,
+}
+
+
+@pytest.mark.parametrize("backend", sorted(jsoncodec._FOUND))
+def test_dumps_identical_across_backends(backend):
+    loads, dumps = jsoncodec._FOUND[backend]
+    out = dumps(DOC)
+    assert out == json.dumps(DOC, ensure_ascii=False, separators=(",", ":"))
+    assert loads(out) == DOC
+
+
+def test_backend_preference_and_override(monkeypatch):
+    monkeypatch.delenv("JSONCODEC_BACKEND", raising=False)
+    first = next(n for n in jsoncodec.PREFERENCE if n in jsoncodec._FOUND)
+    assert jsoncodec._pick(jsoncodec._FOUND) == first
+
+    monkeypatch.setenv("JSONCODEC_BACKEND", "json")
+    assert importlib.reload(jsoncodec).BACKEND == "json"
+
+    monkeypatch.setenv("JSONCODEC_BACKEND", "khong-co")
+    with pytest.raises(ImportError):
+        jsoncodec._pick(jsoncodec._FOUND)
+
+    monkeypatch.delenv("JSONCODEC_BACKEND")
+    importlib.reload(jsoncodec)
+
+
+def test_project():
+    line = jsoncodec.dumps(DOC)
+    assert jsoncodec.project(line, ("categories", "n")) == {"categories": DOC["categories"], "n": 3}
+    assert jsoncodec.project(line, ("missing",)) == {}
@@ -0,0 +1,43 @@
+import random
+
+import pytest
+
+from kwmatch import KeywordMatcher, load_phrases
+
+
+def naive_count(phrases, symbols):
+    counts = {}
+    for seq, label in dict(phrases).items():
+        n = len(seq)
+        hits = sum(1 for i in range(len(symbols) - n + 1) if tuple(symbols[i:i + n]) == seq)
+        if hits:
+            counts[label] = counts.get(label, 0) + hits
+    return counts
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_naive_counting(seed):
+    rnd = random.Random(seed)
+    alphabet = "abcde"
+    phrases = []
+    for _ in range(rnd.randint(1, 30)):
+        seq = tuple(rnd.choice(alphabet) for _ in range(rnd.randint(1, 4)))
+        phrases.append((seq, " ".join(seq)))
+    # token không thuộc keyword nào cắt ngang chuỗi khớp
+    symbols = [rnd.choice(alphabet + "xy") for _ in range(500)]
+    assert KeywordMatcher(phrases).count(symbols) == naive_count(phrases, symbols)
+
+
+def test_overlapping_phrases_and_accumulate():
+    km = KeywordMatcher([(("dữ", "liệu"), "dữ liệu"), (("liệu",), "liệu"),
+                         (("dữ", "liệu", "lớn"), "dữ liệu lớn"), (("dữ", "liệu"), "dữ liệu")])
+    counts = km.count("dữ liệu lớn và dữ liệu".split())
+    assert counts == {"dữ liệu": 2, "liệu": 2, "dữ liệu lớn": 1}
+    assert km.count(["liệu"], counts)["liệu"] == 3
+
+
+def test_load_phrases(tmp_path):
+    path = tmp_path / "keywords.txt"
+    path.write_text("﻿Dữ Liệu\n\nHadoop\n", encoding="utf-8")
+    assert load_phrases(str(path), str.split, str.casefold) == [
+        (("dữ", "liệu"), "dữ liệu"), (("hadoop",), "hadoop")]
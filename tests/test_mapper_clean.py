@@ -0,0 +1,114 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+
+
+@pytest.fixture
+def mc(load_script):
+    return load_script("mapper_clean")
+
+
+@pytest.mark.parametrize("wikitext, text", [
+    ("[[Hà Nội]] và [[Việt Nam|nước Việt Nam]]", "Hà Nội và nước Việt Nam"),
+    ("a {{cite|x={{b|c}}|y=[[d]]}} e", "a e"),
+    ("a {{b|}} c", "a c"),
+    ("a {| class=x\n|-\n| {{b}} || c\n|} d", "a d"),
+    ("a <!-- b }} --> c", "a c"),
+    ("a<ref name=x>{{cite}}</ref> b<ref name=y/> c", "a b c"),
+    ("''nghiêng'' <br/> <b>đậm</b>", "nghiêng đậm"),
+    ("[[Tập tin:x.jpg|nhỏ|chú thích [[y|z]]]] a", "nhỏ|chú thích z a"),
+])
+def test_parse_wikitext(mc, wikitext, text):
+    assert mc.parse_wikitext(wikitext)[0] == text
+
+
+@pytest.mark.parametrize("wikitext, text", [
+    # dấu mở không đóng giữ nguyên là text, phần sau vẫn được làm sạch
+    ("a [[b [[c|d]] e", "a [[b d e"),
+    ("a {{b [[c]] e", "a {{b c e"),
+    ("a {{b [[c}} d", "a d"),
+    ("[[a {{b]] c", "a {{b c"),
+    ("a ]] b }} c |} d", "a ]] b }} c |} d"),
+    ("a < b > c", "a c"),
+    ("a < b", "a < b"),
+    ("a <ref>b", "a b"),
+])
+def test_malformed_markup(mc, wikitext, text):
+    assert mc.parse_wikitext(wikitext)[0] == text
+
+
+def test_deep_nesting_without_recursion(mc):
+    n = 5000
+    assert mc.parse_wikitext("[[a|" * n + "x" + "]]" * n)[0] == "x"
+    assert mc.parse_wikitext("a " + "{{b|" * n + "x" + "}}" * n + " c")[0] == "a c"
+    # không đóng: giữ nguyên, không RecursionError
+    assert mc.parse_wikitext("[[a|" * n)[0] == "[[a|" * n
+
+
+@pytest.mark.parametrize("opener", ["[[", "{{", "{|", "<ref ", "<", "[[a|"])
+def test_unclosed_openers_are_linear(mc, opener):
+    text = (opener + "chữ ") * 20000
+    t0 = time.perf_counter()
+    mc.parse_wikitext(text)
+    assert time.perf_counter() - t0 < 2
+
+
+def test_categories_anywhere(mc):
+    text = ("a [[Thể loại:Việt Nam]] {{Sơ khai|[[Thể loại:Địa lý]]}} "
+            "<!-- [[Thể loại:Ẩn]] --> [[thể loại : Việt Nam|x]]")
+    assert mc.parse_wikitext(text)[1] == ["Việt Nam", "Địa lý", "Ẩn"]
+
+
+def test_categories_match_cat_re(mc):
+    # lấy trong cùng lượt quét nhưng phải giống cat_re.findall trên wikitext gốc
+    frags = ["[[", "[", "]]", "|", "Thể loại:", "thể  loại :", "a", " ", "\n", "{{", "}}",
+             "<!--", "-->", "<ref>", "</ref>", "<b>", "<", ">", "''", "{|", "|}"]
+    rnd = random.Random(0)
+    for _ in range(20000):
+        text = "".join(rnd.choice(frags) for _ in range(rnd.randint(0, 30)))
+        found = []
+        mc._scan(text, [], found)
+        assert found == mc.cat_re.findall(text), text
+
+
+@pytest.mark.parametrize("text", ["<!--" + "[[" * 200000, "[[Thể loại:" * 50000,
+                                  "<b>[[Thể loại:x</b>" * 30000])
+def test_category_scan_is_linear(mc, text):
+    t0 = time.perf_counter()
+    mc.parse_wikitext(text)
+    assert time.perf_counter() - t0 < 2
+
+
+def run_mapper(args, lines):
+    script = os.path.join(os.path.dirname(__file__), "..", "mapreduce", "mapper_clean.py")
+    proc = subprocess.run([sys.executable, script] + args, input="".join(lines),
+                          capture_output=True, text=True, encoding="utf-8", check=True)
+    counters = dict(line.rsplit(",", 2)[1:] for line in proc.stderr.splitlines()
+                    if line.startswith("reporter:counter:clean_cache,"))
+    return proc.stdout, {k: int(v) for k, v in counters.items()}
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_cache_counters(tmp_path, workers):
+    lines = [json.dumps({"page_id": str(i), "title": f"T{i}", "timestamp": "2024-01-01",
+                         "wikitext": f"[[a|chữ {i}]] {{{{b}}}}"}, ensure_ascii=False) + "\n"
+             for i in range(50)]
+    args = ["--workers", str(workers), "--chunk-lines", "7", "--cache-dir", str(tmp_path)]
+    first, counters = run_mapper(args, lines)
+    assert counters == {"hits": 0, "misses": 50}
+    second, counters = run_mapper(args, lines)
+    assert counters == {"hits": 50, "misses": 0}
+    assert first == second
+    assert first.splitlines()[3] == ('{"page_id":"3","title":"T3","timestamp":"2024-01-01",'
+                                     '"categories":[],"text":"chữ 3"}')
+
+
+def test_rules_version_covers_helper_modules(mc, monkeypatch):
+    version = mc.rules_version()
+    monkeypatch.setattr(mc, "RULES_MODULES", ())
+    assert mc.rules_version() != version
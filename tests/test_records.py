@@ -0,0 +1,56 @@
+import os
+import subprocess
+import sys
+
+from records import CAT_KEYWORD, TREND, WORDCOUNT, clean_field, split_value
+
+MAPREDUCE = os.path.join(os.path.dirname(__file__), "..", "mapreduce")
+
+
+def test_schema_roundtrip():
+    line = TREND.format("week", "2024-W09", "dữ liệu", 7)
+    assert line == "week\t2024-W09\tdữ liệu\t7\n"
+    assert TREND.parse(line) == ("week", "2024-W09", "dữ liệu", 7)
+    assert TREND.key("week", "2024-W09", "dữ liệu") == "week\t2024-W09\tdữ liệu"
+    assert CAT_KEYWORD.format(clean_field("a\tb\nc"), "k", 1) == "a b c\tk\t1\n"
+
+
+def test_parse_rejects_bad_lines():
+    assert WORDCOUNT.parse("a\tb\t1\n") is None
+    assert WORDCOUNT.parse("a\tx\n") is None
+    assert split_value("khong-co-tab\n") is None
+    assert split_value("\t3\n") is None
+    assert split_value("a\tb\t3\n") == ("a\tb", "3")
+
+
+def test_streaming_opts():
+    assert CAT_KEYWORD.streaming_opts(1) == [
+        "-D stream.num.map.output.key.fields=2",
+        "-D stream.num.reduce.output.key.fields=2",
+        "-D mapreduce.partition.keypartitioner.options=-k1,1",
+        "-partitioner org.apache.hadoop.mapred.lib.KeyFieldBasedPartitioner",
+    ]
+
+
+def run_reducer(args, lines):
+    proc = subprocess.run([sys.executable] + args, input="".join(lines), cwd=MAPREDUCE,
+                          capture_output=True, text=True, encoding="utf-8", check=True)
+    return proc.stdout.splitlines()
+
+
+def test_reducer_topk_groups():
+    lines = sorted([
+        "Cat A\tx\t3\n", "Cat A\tx\t2\n", "Cat A\ty\t4\n", "Cat A\tz\t1\n",
+        "Cat B\tx\t1\n", "dòng hỏng\n", "Cat B\t\n",
+    ])
+    assert run_reducer(["reducer_topk.py", "--k", "2"], lines) == [
+        "Cat A\tx\t5", "Cat A\ty\t4", "Cat A\t*\t10",
+        "Cat B\tx\t1", "Cat B\t*\t1",
+    ]
+
+
+def test_reducer_sum_sorted_and_hash_agree():
+    lines = sorted(f"{k}\t{v}\n" for k, v in [("a\tb", 1), ("a\tb", 2), ("c", 5), ("a", 1)])
+    sorted_out = run_reducer(["reducer_sum.py"], lines)
+    assert sorted_out == ["a\t1", "a\tb\t3", "c\t5"]
+    assert sorted(run_reducer(["reducer_sum.py", "--hash"], lines[::-1])) == sorted_out
@@ -0,0 +1,35 @@
+import io
+import random
+from collections import Counter
+
+import pytest
+
+
+@pytest.fixture
+def reducer_sum(load_script):
+    return load_script("reducer_sum")
+
+
+def test_skewed_bucket_splits_at_next_level(reducer_sum):
+    # các key cùng độ dài dồn vào bucket 0 ở mức 0 phải được chia ra nhiều
+    # bucket ở mức 1 (crc32 với giá trị khởi tạo khác giữ nguyên bucket)
+    keys = [f"key{i:06d}" for i in range(20000)]
+    skewed = [k for k in keys if reducer_sum.bucket_of(k, 0) == 0]
+    assert len(skewed) > 100
+    for level in (1, 2):
+        spread = Counter(reducer_sum.bucket_of(k, level) for k in skewed)
+        assert len(spread) > reducer_sum.SPILL_BUCKETS // 2
+        assert max(spread.values()) < len(skewed) / 4
+
+
+def test_hash_sum_with_spill_matches_sorted_sum(reducer_sum, tmp_path):
+    rnd = random.Random(1)
+    lines = [f"cat {rnd.randrange(3000)}\tkw{rnd.randrange(5)}\t{rnd.randrange(1, 9)}\n"
+             for _ in range(30000)]
+    lines.append("dòng hỏng\n")
+
+    out = io.StringIO()
+    reducer_sum.hash_sum(lines, out, max_bytes=20_000, tmp_dir=str(tmp_path))
+    expected = io.StringIO()
+    reducer_sum.sorted_sum(sorted(lines), expected)
+    assert sorted(out.getvalue().splitlines()) == sorted(expected.getvalue().splitlines())
@@ -0,0 +1,61 @@
+import random
+from collections import Counter
+
+from sketch import CountMinSketch, SpaceSaving, dumps_summary, loads_summary
+
+
+def zipf_stream(n, vocab, seed):
+    rnd = random.Random(seed)
+    words = [f"w{i}" for i in range(vocab)]
+    weights = [1 / (i + 1) for i in range(vocab)]
+    return rnd.choices(words, weights, k=n)
+
+
+def test_count_min_never_underestimates():
+    stream = zipf_stream(20000, 3000, 0)
+    truth = Counter(stream)
+    cms = CountMinSketch(width=512, depth=4)
+    for w in stream:
+        cms.add(w)
+    assert cms.total == len(stream)
+    over = [cms.estimate(w) - c for w, c in truth.items()]
+    assert min(over) >= 0
+    # sai số <= e/width * N với xác suất cao: gần như mọi key nằm trong cận
+    assert sum(o > cms.error_bound for o in over) <= len(over) * 0.05
+
+
+def test_space_saving_bounds_and_heavy_hitters():
+    stream = zipf_stream(20000, 3000, 1)
+    truth = Counter(stream)
+    ss = SpaceSaving(k=100)
+    for w in stream:
+        ss.add(w)
+    for key, count, err in ss.top(100):
+        assert count - err <= truth[key] <= count
+    assert [k for k, _, _ in ss.top(5)] == [k for k, _ in truth.most_common(5)]
+
+
+def test_merge_matches_single_pass():
+    a, b = zipf_stream(10000, 2000, 2), zipf_stream(10000, 2000, 3)
+    truth = Counter(a + b)
+
+    whole = CountMinSketch(width=1024, depth=3)
+    for w in a + b:
+        whole.add(w)
+    parts = []
+    for stream in (a, b):
+        cms, ss = CountMinSketch(width=1024, depth=3), SpaceSaving(k=50)
+        for w in stream:
+            cms.add(w)
+            ss.add(w)
+        # mapper ghi một dòng JSON, reducer đọc lại rồi gộp
+        parts.append(loads_summary(dumps_summary(cms, ss)))
+
+    cms, ss = parts[0]
+    cms.merge(parts[1][0])
+    ss.merge(parts[1][1])
+    assert cms.total == whole.total
+    assert all(cms.estimate(w) == whole.estimate(w) for w in truth)
+    for key, count, err in ss.top(50):
+        assert count - err <= truth[key] <= count
+    assert [k for k, _, _ in ss.top(3)] == [k for k, _ in truth.most_common(3)]
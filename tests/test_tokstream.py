@@ -0,0 +1,51 @@
+import json
+
+from kwmatch import KeywordMatcher
+from tokstream import TOKEN_RE, TokenStream, build, iter_docs, norm
+
+DOCS = [
+    {"page_id": "7", "timestamp": "2024-03-05T10:00:00Z", "categories": ["Khoa học", " "],
+     "text": "Dữ liệu lớn, DỮ LIỆU nhỏ_gọn! ﬁle"},
+    {"page_id": "x", "timestamp": "", "categories": [], "text": ""},
+    {"page_id": 9, "timestamp": "2024-03-05", "categories": ["Khoa học", "Máy tính"],
+     "text": "dữ liệu\tlớn"},
+]
+
+
+def write_input(tmp_path):
+    path = tmp_path / "part-00000"
+    lines = [json.dumps(d, ensure_ascii=False) for d in DOCS[:2]] + ["", "{hỏng", json.dumps(DOCS[2])]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_build_roundtrip(tmp_path):
+    out = tmp_path / "tok"
+    meta = build([write_input(tmp_path)], str(out))
+    assert meta["docs"] == 3 and meta["dates"] == 1 and meta["categories"] == 2
+
+    ts = TokenStream(str(out))
+    with open(out / "part-00000.tok", "rb") as f:
+        docs = list(iter_docs(f))
+    assert [d[0] for d in docs] == [7, 0, 9]
+    for (page_id, date_id, cat_ids, tok_ids), src in zip(docs, DOCS):
+        assert [ts.tokens[i] for i in tok_ids] == TOKEN_RE.findall(norm(src["text"]))
+        assert [ts.categories[i] for i in cat_ids] == [c.strip() for c in src["categories"] if c.strip()]
+    # date id = dòng + 1, 0 = không có ngày
+    assert [ts.date(d[1]) for d in docs] == ["2024-03-05", None, "2024-03-05"]
+    assert meta["tokens"] == sum(len(d[3]) for d in docs)
+
+
+def test_phrase_ids_count_like_strings(tmp_path):
+    out = tmp_path / "tok"
+    build([write_input(tmp_path)], str(out))
+    ts = TokenStream(str(out))
+    phrases = [(("dữ", "liệu"), "dữ liệu"), (("dữ", "liệu", "lớn"), "dữ liệu lớn"),
+               (("không", "có"), "không có")]
+    ids = ts.phrase_ids(phrases)
+    assert [label for _, label in ids] == ["dữ liệu", "dữ liệu lớn"]
+
+    by_id, by_str = KeywordMatcher(ids), KeywordMatcher(phrases)
+    with open(out / "part-00000.tok", "rb") as f:
+        for _, _, _, tok_ids in iter_docs(f):
+            assert by_id.count(tok_ids) == by_str.count([ts.tokens[i] for i in tok_ids])
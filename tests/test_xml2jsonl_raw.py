@@ -0,0 +1,180 @@
+import gzip
+import json
+import os
+
+import pytest
+
+import xml2jsonl_raw as x2j
+
+PAGE = """  <page>
+    <title>Trang {i}</title>
+    <ns>0</ns>
+    <id>{i}</id>
+    <revision>
+      <id>{rev}</id>
+      <timestamp>2024-01-{day:02d}T00:00:00Z</timestamp>
+      <text>{text}</text>
+    </revision>
+  </page>
+"""
+
+
+def write_dump(path, n_pages, text_bytes):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n')
+        for i in range(1, n_pages + 1):
+            text = (f"bài {i} " * (text_bytes // 8 + 1))[:text_bytes]
+            f.write(PAGE.format(i=i, rev=1000 + i, day=i % 28 + 1, text=text))
+        f.write("</mediawiki>\n")
+
+
+def read_ids(out_dir):
+    ids = []
+    for name in sorted(os.listdir(out_dir)):
+        if name.endswith(".jsonl"):
+            with open(os.path.join(out_dir, name), encoding="utf-8") as f:
+                ids.extend(json.loads(line)["page_id"] for line in f)
+    return ids
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.mark.parametrize("text_bytes", [200, 50_000])
+def test_resume_after_crash(tmp_path, monkeypatch, text_bytes):
+    # page 50 KB lớn hơn nhiều lần buffer 16 KB của iterparse
+    xml = tmp_path / "dump.xml"
+    write_dump(xml, 40, text_bytes)
+    out = tmp_path / "out"
+    opts = {"prefix": "wiki_raw", "compression": "none", "max_bytes": 0, "max_docs": 15}
+
+    orig_write = x2j.ShardWriter.write
+    calls = {"n": 0}
+
+    def crashing_write(self, line):
+        calls["n"] += 1
+        if calls["n"] > 12:
+            raise Crash()
+        orig_write(self, line)
+
+    monkeypatch.setattr(x2j.ShardWriter, "write", crashing_write)
+    with pytest.raises(Crash):
+        x2j.convert_with_checkpoint(str(xml), str(out), opts, every=5)
+    monkeypatch.setattr(x2j.ShardWriter, "write", orig_write)
+
+    ckpt = json.loads((out / "_checkpoint.json").read_text())
+    assert ckpt["last_page_id"] == "10"
+    with open(xml, "rb") as f:
+        f.seek(ckpt["input_offset"])
+        assert f.read(len(x2j.PAGE_OPEN)) == x2j.PAGE_OPEN
+
+    shards = x2j.convert_with_checkpoint(str(xml), str(out), opts, every=5, resume=True)
+    assert read_ids(out) == [str(i) for i in range(1, 41)]
+    assert sum(s["records"] for s in shards) == 40
+
+
+def test_resume_skips_past_missing_page_id(tmp_path, capsys):
+    # checkpoint trỏ tới page_id không còn trong input: bỏ qua tới page_id lớn hơn
+    xml = tmp_path / "dump.xml"
+    write_dump(xml, 6, 100)
+    out = tmp_path / "out"
+    opts = {"max_docs": 0}
+    x2j.convert_with_checkpoint(str(xml), str(out), opts, every=2)
+    ckpt = json.loads((out / "_checkpoint.json").read_text())
+    ckpt.update(done=False, last_page_id="3", input_offset=0, pages=3,
+                writer={"shards": [], "index": 0, "offset": 0, "records": 0, "raw_bytes": 0})
+    (out / "_checkpoint.json").write_text(json.dumps(ckpt))
+    os.remove(out / "wiki_raw-00000.jsonl")
+
+    x2j.convert_with_checkpoint(str(xml), str(out), opts, every=2, resume=True)
+    assert "Resume từ page_id=3 (3 page đã ghi)" in capsys.readouterr().out
+    assert read_ids(out) == ["4", "5", "6"]
+
+
+def test_range_reader_page_starts_across_chunks(tmp_path):
+    xml = tmp_path / "dump.xml"
+    write_dump(xml, 5, 300)
+    data = xml.read_bytes()
+    expected = []
+    i = data.find(x2j.PAGE_OPEN)
+    while i >= 0:
+        expected.append(i)
+        i = data.find(x2j.PAGE_OPEN, i + 1)
+
+    reader = x2j.RangeReader(str(xml), 0, len(data), chunk_size=7, track_pages=True)
+    try:
+        while reader.read(7):
+            pass
+    finally:
+        reader.close()
+    assert list(reader.page_starts) == expected
+
+
+def test_convert_delta(tmp_path):
+    def doc(i, ts="2024-01-01T00:00:00Z", text="a"):
+        return {"page_id": str(i), "title": f"T{i}", "timestamp": ts, "wikitext": text}
+
+    manifest = str(tmp_path / "m1.tsv.gz")
+    w = x2j.ShardWriter(str(tmp_path / "full"))
+    stats = x2j.convert_delta([doc(1), doc(2), doc(3)], w, manifest_out=manifest)
+    assert stats["added"] == 3
+
+    with gzip.open(manifest, "rt", encoding="utf-8") as f:
+        assert len(f.read().splitlines()) == 3
+
+    out = tmp_path / "delta"
+    w = x2j.ShardWriter(str(out))
+    docs = [doc(1), doc(2, text="b"), doc(4)]
+    stats = x2j.convert_delta(docs, w, prev_manifest=manifest,
+                              manifest_out=str(tmp_path / "m2.tsv.gz"))
+    assert stats == {"added": 1, "changed": 1, "unchanged": 1, "deleted": 1}
+    assert read_ids(out) == ["2", "4"]
+    assert (out / "deleted.txt").read_text().split() == ["3"]
+
+
+def test_convert_delta_from_dumps(tmp_path):
+    first = tmp_path / "dump1.xml"
+    write_dump(first, 5, 30)
+    manifest = str(tmp_path / "m1.tsv")
+    x2j.convert_delta(x2j.iter_pages(str(first)), x2j.ShardWriter(str(tmp_path / "full")),
+                      manifest_out=manifest)
+    assert sorted(x2j.load_manifest(manifest)) == ["1", "2", "3", "4", "5"]
+
+    # tháng sau: page 2 có revision mới (chỉ đổi timestamp), page 3 đổi nội dung,
+    # page 5 bị xóa, page 6 mới
+    text = first.read_text(encoding="utf-8")
+    text = text.replace("<timestamp>2024-01-03T", "<timestamp>2024-02-03T")
+    text = text.replace("bài 3 ", "bài ba ")
+    text = text.replace(PAGE.format(i=5, rev=1005, day=6, text=("bài 5 " * 4)[:30]),
+                        PAGE.format(i=6, rev=1006, day=7, text="mới"))
+    second = tmp_path / "dump2.xml"
+    second.write_text(text, encoding="utf-8")
+
+    out = tmp_path / "delta"
+    tombstones = tmp_path / "gone.txt"
+    stats = x2j.convert_delta(x2j.iter_pages(str(second)), x2j.ShardWriter(str(out)),
+                              prev_manifest=manifest, tombstones_path=str(tombstones))
+    assert stats == {"added": 1, "changed": 2, "unchanged": 2, "deleted": 1}
+    assert read_ids(out) == ["2", "3", "6"]
+    assert tombstones.read_text().split() == ["5"]
+    assert not (out / "deleted.txt").exists()
+
+
+def test_convert_delta_id_range_keeps_other_pages(tmp_path):
+    def doc(i):
+        return {"page_id": str(i), "title": f"T{i}", "timestamp": "2024-01-01T00:00:00Z",
+                "wikitext": "a"}
+
+    m1, m2 = str(tmp_path / "m1.tsv"), str(tmp_path / "m2.tsv")
+    x2j.convert_delta([doc(i) for i in range(1, 41)], x2j.ShardWriter(str(tmp_path / "full")),
+                      manifest_out=m1)
+
+    # --page-ids 1-20: page 7 đã bị xóa, page 21..40 chỉ nằm ngoài khoảng
+    out = tmp_path / "delta"
+    docs = [doc(i) for i in range(1, 21) if i != 7]
+    stats = x2j.convert_delta(docs, x2j.ShardWriter(str(out)), prev_manifest=m1,
+                              manifest_out=m2, min_id=1, max_id=20)
+    assert stats == {"added": 0, "changed": 0, "unchanged": 19, "deleted": 1}
+    assert (out / "deleted.txt").read_text().split() == ["7"]
+    assert x2j.load_manifest(m2) == {k: v for k, v in x2j.load_manifest(m1).items() if k != "7"}
@@ -0,0 +1,74 @@
+"""
+Benchmark giải mã JSON cho từng mapper: json.loads (cũ) so với jsoncodec.loads
+và jsoncodec.project chỉ lấy các field mapper cần.
+
+    python tools/bench_codec.py /data/wiki_clean_sample.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mapreduce"))
+import jsoncodec  # noqa: E402
+
+# cách giải mã mà từng mapper / indexer dùng: None = loads cả dòng
+MAPPER_FIELDS = {
+    "mapper_clean": None,
+    "mapper_wc": None,
+    "mapper_trend_kwlist": None,
+    "mapper_cat_kwlist": None,
+    "mapper_cat_docs": ("categories",),
+    "index_all_data.wiki_docs": None,
+}
+
+
+def timeit(fn, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("jsonl", help="file JSONL output của mapper_clean")
+    ap.add_argument("--limit", type=int, default=20000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    with open(args.jsonl, encoding="utf-8") as f:
+        lines = [line for _, line in zip(range(args.limit), f) if line.strip()]
+    mb = sum(len(line.encode("utf-8")) for line in lines) / 2**20
+
+    print(f"backend={jsoncodec.BACKEND} lines={len(lines):,} size={mb:.1f} MB")
+    base = timeit(json.loads, lines, args.repeat)
+    print(f"{'json.loads (cũ)':28s} {len(lines) / base:12,.0f} lines/s  1.00x")
+
+    for name, (lo, _) in jsoncodec._FOUND.items():
+        t = timeit(lo, lines, args.repeat)
+        print(f"{'backend ' + name:28s} {len(lines) / t:12,.0f} lines/s  {base / t:.2f}x")
+    print()
+
+    for name, fields in MAPPER_FIELDS.items():
+        if fields is None:
+            fn = jsoncodec.loads
+        else:
+            want = frozenset(fields)
+            fn = lambda line, want=want: jsoncodec.project(line, want)  # noqa: E731
+        # kiểm tra kết quả trùng với json.loads
+        for line in lines[:1000]:
+            full = json.loads(line)
+            got = fn(line)
+            expect = full if fields is None else {k: full[k] for k in fields if k in full}
+            assert got == expect, name
+        t = timeit(fn, lines, args.repeat)
+        print(f"{name:28s} {len(lines) / t:12,.0f} lines/s  {base / t:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark bộ nhớ và tốc độ của iter_pages (bounded) so với iter_pages_tree (cũ).
+
+    python tools/bench_iter_pages.py D:\\bd-project\\data\\viwiki-latest-pages-articles.xml
+    python tools/bench_iter_pages.py --synthetic 200000
+
+Mỗi mode chạy trong một process riêng; RSS được lấy mẫu đều đặn trong suốt
+quá trình parse để thấy RSS có phẳng hay không.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+
+
+def rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return float("nan")
+
+
+def write_synthetic(path: str, pages: int):
+    body = "Nội dung bài viết [[Hà Nội|thủ đô]] {{cite|x}} " * 40
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<mediawiki xmlns="http://www.mediawiki.org/xml/export-0.10/">\n')
+        for i in range(1, pages + 1):
+            f.write(
+                f"  <page>\n    <title>Trang {i}</title>\n    <ns>0</ns>\n"
+                f"    <id>{i}</id>\n    <revision>\n      <id>{i + 10**7}</id>\n"
+                f"      <timestamp>2024-01-01T00:00:00Z</timestamp>\n"
+                f"      <text xml:space=\"preserve\">{body}</text>\n"
+                f"    </revision>\n  </page>\n"
+            )
+        f.write("</mediawiki>\n")
+
+
+def run_one(mode: str, xml_path: str, samples: int):
+    import xml2jsonl_raw as X
+
+    fn = X.iter_pages if mode == "bounded" else X.iter_pages_tree
+    size_mb = os.path.getsize(xml_path) / 2**20
+    every = max(1, samples)
+
+    rss = [rss_mb()]
+    t0 = time.perf_counter()
+    n = 0
+    for _ in fn(xml_path):
+        n += 1
+        if n % every == 0:
+            rss.append(rss_mb())
+    dt = time.perf_counter() - t0
+    rss.append(rss_mb())
+
+    q = len(rss) // 4 or 1
+    print(f"{mode:8s} pages={n:,} time={dt:.1f}s "
+          f"{n / dt:,.0f} pages/s {size_mb / dt:.1f} MB/s | "
+          f"RSS MB start={rss[0]:.0f} q1={rss[q]:.0f} q2={rss[2 * q]:.0f} "
+          f"q3={rss[min(3 * q, len(rss) - 1)]:.0f} end={rss[-1]:.0f} max={max(rss):.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("xml", nargs="?", help="file XML dump (đã giải nén)")
+    ap.add_argument("--synthetic", type=int, default=0,
+                    help="tự sinh dump giả với N page nếu không có file thật")
+    ap.add_argument("--modes", default="bounded,tree")
+    ap.add_argument("--sample-every", type=int, default=1000)
+    ap.add_argument("--_child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args._child:
+        run_one(args._child, args.xml, args.sample_every)
+        return
+
+    tmp = None
+    xml_path = args.xml
+    if not xml_path:
+        fd, tmp = tempfile.mkstemp(suffix=".xml")
+        os.close(fd)
+        write_synthetic(tmp, args.synthetic or 100000)
+        xml_path = tmp
+
+    try:
+        for mode in args.modes.split(","):
+            subprocess.run([sys.executable, __file__, xml_path, "--_child", mode,
+                            "--sample-every", str(args.sample_every)], check=True)
+    finally:
+        if tmp:
+            os.remove(tmp)
+
+
+if __name__ == "__main__":
+    main()
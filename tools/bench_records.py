@@ -0,0 +1,146 @@
+"""
+Benchmark tách record output MapReduce trong indexer: code cũ của
+index_all_data.py (key nối bằng \\x01; trend tách bằng regex
+^(\\d{4})-(\\d{2})(.+)$, category_keyword dò keyword bằng endswith trên cả
+KEYWORDS) so với records.py (key nhiều field phân cách TAB, một lần split).
+
+    python tools/bench_records.py
+    python tools/bench_records.py --keywords keywords.txt --lines 500000
+
+Mapper ghi keyword đã chuẩn hóa (casefold), còn indexer cũ dò theo dòng gốc
+của keywords.txt (chỉ sắp theo độ dài). Keyword viết hoa ("Internet") không
+khớp nữa, và nếu một keyword khác là hậu tố của nó ("net") thì endswith khớp
+nhầm keyword đó, phần còn lại bị dồn vào category. Danh sách mặc định có sẵn
+các cặp hậu tố như vậy để thấy lỗi này.
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import unicodedata
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mapreduce"))
+from records import CAT_KEYWORD, TREND  # noqa: E402
+
+OLD_SEP = "\x01"
+
+# keyword viết như trong keywords.txt; mỗi cặp có một keyword là hậu tố của
+# keyword kia sau khi casefold
+DEFAULT_KEYWORDS = [
+    "Internet", "net", "Website", "site", "Facebook", "book", "Blockchain", "chain",
+    "Big Data", "data", "mạng", "phần mềm", "mềm", "bảo mật", "mật", "dữ liệu", "liệu",
+]
+
+
+def norm(s):
+    return unicodedata.normalize("NFKC", s).casefold()
+
+
+def load_keywords(path, n):
+    if path:
+        with open(path, encoding="utf-8-sig") as f:
+            kws = [line.strip() for line in f if line.strip()]
+    else:
+        kws = DEFAULT_KEYWORDS + [f"kw{i}" for i in range(n)]
+    # như load_keywords() cũ: dài trước, giữ nguyên chữ hoa
+    kws.sort(key=len, reverse=True)
+    return kws
+
+
+# ---------- code cũ của index_all_data.py (theo từng dòng của hdfs dfs -cat) ----------
+
+OLD_TREND_RE = re.compile(r'^(\d{4})-(\d{2})(.+)$')
+
+
+def old_trend_parse(line):
+    parts = line.split('\t')
+    if len(parts) == 2:
+        match = OLD_TREND_RE.match(parts[0])
+        if match:
+            return match.group(1), match.group(2), match.group(3), int(parts[1])
+    return None
+
+
+def old_cat_parse(line, keywords):
+    parts = line.split('\t')
+    if len(parts) == 2:
+        cat_keyword = parts[0]
+        matched_keyword = None
+        for kw in keywords:
+            if cat_keyword.endswith(kw):
+                matched_keyword = kw
+                break
+        if matched_keyword:
+            category = cat_keyword[:-len(matched_keyword)]
+            if category:
+                return category, matched_keyword, int(parts[1])
+    return None
+
+
+def timeit(fn, lines, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def report(name, n, t, base):
+    print(f"{name:32s} {n / t:12,.0f} lines/s  {base / t:6.2f}x")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--keywords", help="keywords.txt (mặc định: DEFAULT_KEYWORDS + --keywords-n keyword)")
+    ap.add_argument("--keywords-n", type=int, default=200)
+    ap.add_argument("--lines", type=int, default=200000)
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    rnd = random.Random(0)
+    keywords = load_keywords(args.keywords, args.keywords_n)
+    emitted = sorted({norm(k) for k in keywords})
+    cats = [f"Danh mục {i}" for i in range(500)]
+    rows = [(rnd.choice(cats), rnd.choice(emitted), rnd.randint(1, 10**6))
+            for _ in range(args.lines)]
+
+    old = [f"{c}{OLD_SEP}{k}\t{v}" for c, k, v in rows]
+    new = [CAT_KEYWORD.format(c, k, v) for c, k, v in rows]
+
+    old_out = [old_cat_parse(line, keywords) for line in old]
+    dropped = sum(1 for r in old_out if r is None)
+    wrong_kw = sum(1 for r, row in zip(old_out, rows) if r is not None and r[1] != row[1])
+    sep_left = sum(1 for r in old_out if r is not None and r[0].endswith(OLD_SEP))
+    assert all(CAT_KEYWORD.parse(line) == row for line, row in zip(new, rows))
+
+    print(f"category_keyword: {len(rows):,} lines, {len(keywords)} keywords")
+    base = timeit(lambda line: old_cat_parse(line, keywords), old, args.repeat)
+    report("endswith x KEYWORDS (cũ)", len(rows), base, base)
+    report("records.CAT_KEYWORD.parse", len(rows), timeit(CAT_KEYWORD.parse, new, args.repeat), base)
+    report("str.split (sàn)", len(rows), timeit(lambda line: line.split("\t"), new, args.repeat), base)
+    print(f"  cách cũ: khớp nhầm keyword hậu tố {wrong_kw:,}, bỏ sót {dropped:,} / {len(rows):,} dòng;"
+          f" {sep_left:,} category còn dính \\x01")
+    print()
+
+    res = ["day", "week", "month", "year"]
+    months = [f"{y}-{m:02d}" for y in range(2015, 2025) for m in range(1, 13)]
+    trows = [(rnd.choice(months), rnd.choice(emitted), rnd.randint(1, 10**6))
+             for _ in range(args.lines)]
+    # job cũ chỉ có rollup theo tháng
+    old = [f"{p}{OLD_SEP}{k}\t{v}" for p, k, v in trows]
+    new = [TREND.format(rnd.choice(res), p, k, v) for p, k, v in trows]
+    sep_left = sum(1 for line in old if old_trend_parse(line)[2].startswith(OLD_SEP))
+
+    print(f"trend: {len(trows):,} lines")
+    base = timeit(old_trend_parse, old, args.repeat)
+    report("regex ^(\\d{4})-(\\d{2})(.+)$ (cũ)", len(trows), base, base)
+    report("records.TREND.parse", len(trows), timeit(TREND.parse, new, args.repeat), base)
+    print(f"  cách cũ: {sep_left:,} / {len(trows):,} keyword còn dính \\x01")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Đối chiếu và đo tốc độ bộ lọc từ tiếng Việt của mapper_wc:
+is_vietnamese_word_nfd (bản gốc) so với is_vietnamese_word (tra bảng + cache).
+
+    python tools/bench_vn_classifier.py /data/wiki_clean_sample.jsonl
+
+1. Kiểm tra toàn bộ codepoint Unicode (ghép với 'a' cho đủ độ dài) và mọi
+   token của mẫu: hai bản phải cho cùng kết quả chấp nhận/loại.
+2. Đo docs/s của vòng lặp token của mapper_wc với từng bản.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "mapreduce"))
+import mapper_wc as W  # noqa: E402
+
+
+def check_codepoints():
+    bad = 0
+    for cp in range(0x110000):
+        if 0xD800 <= cp <= 0xDFFF:
+            continue
+        for tok in ("a" + chr(cp), chr(cp) * 2):
+            if W.is_vietnamese_word_nfd(tok) != W.is_vietnamese_word(tok):
+                bad += 1
+    return bad
+
+
+def run(texts, classify):
+    t0 = time.perf_counter()
+    kept = 0
+    for text in texts:
+        for tok in W.TOKEN_RE.findall(W.norm(text)):
+            if tok in W.STOP:
+                continue
+            if classify(tok):
+                kept += 1
+    return time.perf_counter() - t0, kept
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("jsonl", help="file JSONL output của mapper_clean")
+    ap.add_argument("--limit", type=int, default=5000)
+    args = ap.parse_args()
+
+    with open(args.jsonl, encoding="utf-8") as f:
+        texts = [json.loads(line).get("text") or ""
+                 for _, line in zip(range(args.limit), f) if line.strip()]
+
+    bad = check_codepoints()
+    print(f"codepoint check: {bad} mismatches")
+
+    tokens = {tok for text in texts for tok in W.TOKEN_RE.findall(W.norm(text))}
+    bad = sum(W.is_vietnamese_word_nfd(t) != W.is_vietnamese_word(t) for t in tokens)
+    print(f"corpus check: {len(tokens):,} distinct tokens, {bad} mismatches")
+
+    W.is_vietnamese_word.cache_clear()
+    t_old, k_old = run(texts, W.is_vietnamese_word_nfd)
+    t_new, k_new = run(texts, W.is_vietnamese_word)
+    assert k_old == k_new
+    print(f"nfd    {len(texts) / t_old:10,.0f} docs/s")
+    print(f"table  {len(texts) / t_new:10,.0f} docs/s  {t_old / t_new:.2f}x "
+          f"(cache {W.is_vietnamese_word.cache_info().currsize:,} tokens)")
+
+
+if __name__ == "__main__":
+    main()
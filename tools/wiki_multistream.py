@@ -0,0 +1,108 @@
+"""
+Đọc trực tiếp bản dump pages-articles-multistream.xml.bz2.
+
+File multistream gồm nhiều stream bz2 độc lập nối nhau (mỗi stream ~100 page),
+file index đi kèm có dạng `offset:page_id:title` cho từng page. Nhờ đó có thể
+seek tới từng stream, giải nén song song và không cần file XML trung gian.
+"""
+import bz2
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from xml2jsonl_raw import iter_pages
+
+
+def default_index_path(dump_path: str) -> str:
+    # viwiki-...-multistream.xml.bz2 -> viwiki-...-multistream-index.txt.bz2
+    if dump_path.endswith(".xml.bz2"):
+        return dump_path[:-len(".xml.bz2")] + "-index.txt.bz2"
+    return dump_path + "-index.txt.bz2"
+
+
+def parse_id_range(spec):
+    """'LO-HI' -> (LO, HI); bỏ trống một đầu thì không giới hạn đầu đó."""
+    if not spec:
+        return None, None
+    lo, _, hi = spec.partition("-")
+    return (int(lo) if lo else None), (int(hi) if hi else None)
+
+
+def read_stream_table(index_path: str, min_id=None, max_id=None):
+    """
+    Đọc file index, trả về danh sách (offset, [page_id...]) theo thứ tự offset.
+    Chỉ giữ các stream có ít nhất một page_id nằm trong khoảng yêu cầu.
+    """
+    streams = []
+    cur_off, cur_ids = None, []
+    opener = bz2.open if index_path.endswith(".bz2") else open
+    with opener(index_path, "rt", encoding="utf-8") as f:
+        for line in f:
+            off, page_id, _ = line.split(":", 2)
+            off, page_id = int(off), int(page_id)
+            if off != cur_off:
+                if cur_off is not None:
+                    streams.append((cur_off, cur_ids))
+                cur_off, cur_ids = off, []
+            cur_ids.append(page_id)
+    if cur_off is not None:
+        streams.append((cur_off, cur_ids))
+
+    def wanted(ids):
+        return any((min_id is None or i >= min_id) and (max_id is None or i <= max_id)
+                   for i in ids)
+
+    # offset của stream kế tiếp là điểm kết thúc (gần đúng) của stream hiện tại
+    table = []
+    for k, (off, ids) in enumerate(streams):
+        end = streams[k + 1][0] if k + 1 < len(streams) else None
+        if wanted(ids):
+            table.append((off, end))
+    return table
+
+
+def decode_stream(args):
+    """Giải nén một stream bz2 và parse các <page> trong đó."""
+    dump_path, offset, end, min_id, max_id = args
+    with open(dump_path, "rb") as f:
+        f.seek(offset)
+        raw = f.read(end - offset) if end is not None else f.read()
+
+    # Chỉ giải nén đúng một stream; phần thừa (stream footer) nằm ở unused_data
+    xml = bz2.BZ2Decompressor().decompress(raw)
+    source = io.BytesIO(b"<pages>" + xml + b"</pages>")
+
+    docs = []
+    for doc in iter_pages(source):
+        pid = int(doc["page_id"])
+        if (min_id is not None and pid < min_id) or (max_id is not None and pid > max_id):
+            continue
+        docs.append(doc)
+    return docs
+
+
+def iter_pages_multistream(dump_path: str, index_path: str = None, workers: int = 1,
+                           min_id=None, max_id=None, max_inflight: int = None):
+    """
+    Yield page giống hệt iter_pages, theo đúng thứ tự trong dump.
+    workers > 1: các stream được giải nén trong process pool; số stream đang xử lý
+    bị giới hạn bởi max_inflight để RAM không phình ra.
+    """
+    index_path = index_path or default_index_path(dump_path)
+    tasks = ((dump_path, off, end, min_id, max_id)
+             for off, end in read_stream_table(index_path, min_id, max_id))
+
+    if workers <= 1:
+        for task in tasks:
+            yield from decode_stream(task)
+        return
+
+    max_inflight = max_inflight or workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.submit(decode_stream, task))
+            if len(pending) >= max_inflight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -1,5 +1,15 @@
+import argparse
+import bz2
+import gzip
+import hashlib
 import json
+import os
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+PAGE_OPEN = b"<page>"
+PAGE_CLOSE = b"</page>"
 
 
 def strip_ns(tag: str) -> str:
@@ -21,40 +31,653 @@ def fix_mojibake(s: str) -> str:
     return s
 
 
-def iter_pages(xml_path: str):
-    # Streaming parse: không load cả file vào RAM
-    context = ET.iterparse(xml_path, events=("end",))
-    for _, elem in context:
-        if strip_ns(elem.tag) != "page":
+def page_record(elem):
+    """Chuyển một phần tử <page> thành record, None nếu là redirect / ns != 0."""
+    title = elem.findtext(".//{*}title") or ""
+    ns = elem.findtext(".//{*}ns") or ""
+    page_id = elem.findtext(".//{*}id") or ""
+    timestamp = elem.findtext(".//{*}revision/{*}timestamp") or ""
+    text = elem.findtext(".//{*}revision/{*}text") or ""
+
+    # bỏ redirect + chỉ lấy ns=0 (bài viết chính)
+    if elem.find(".//{*}redirect") is not None or ns != "0":
+        return None
+
+    return {
+        "page_id": page_id,
+        "title": fix_mojibake(title),
+        "timestamp": timestamp,
+        "wikitext": fix_mojibake(text),
+    }
+
+
+def local_tag(tag: str) -> str:
+    return tag.rpartition("}")[2]
+
+
+def iter_pages(source, on_page_start=None):
+    """
+    Streaming parse với bộ nhớ cố định.
+
+    Thay vì gọi findtext(".//{*}...") trên từng <page>, theo dõi đường dẫn thẻ
+    trong lúc parse để lấy các field cần thiết. Sau mỗi <page> gọi root.clear()
+    để tách hẳn phần tử khỏi cây, nên RSS không tăng theo số page.
+    source: đường dẫn hoặc file-like (RangeReader, BytesIO...)
+    on_page_start: nếu có, được gọi mỗi khi gặp thẻ mở <page> (kể cả page bị
+    bỏ qua), trước khi page đó được yield.
+    """
+    root = None
+    stack = []
+    page = None
+
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            tag = local_tag(elem.tag)
+            stack.append(tag)
+            if tag == "page":
+                page = {"redirect": False}
+                if on_page_start is not None:
+                    on_page_start()
+            continue
+
+        tag = stack.pop()
+        if page is None:
             continue
+        parent = stack[-1] if stack else None
 
-        title = elem.findtext(".//{*}title") or ""
-        ns = elem.findtext(".//{*}ns") or ""
-        page_id = elem.findtext(".//{*}id") or ""
-        timestamp = elem.findtext(".//{*}revision/{*}timestamp") or ""
-        text = elem.findtext(".//{*}revision/{*}text") or ""
+        if parent == "page":
+            if tag in ("title", "ns", "id"):
+                page.setdefault(tag, elem.text or "")
+            elif tag == "redirect":
+                page["redirect"] = True
+        elif parent == "revision" and tag in ("timestamp", "text"):
+            page.setdefault(tag, elem.text or "")
+        elif tag == "page":
+            # bỏ redirect + chỉ lấy ns=0 (bài viết chính)
+            if not page["redirect"] and page.get("ns") == "0":
+                yield {
+                    "page_id": page.get("id", ""),
+                    "title": fix_mojibake(page.get("title", "")),
+                    "timestamp": page.get("timestamp", ""),
+                    "wikitext": fix_mojibake(page.get("text", "")),
+                }
+            page = None
+            root.clear()
 
-        # bỏ redirect + chỉ lấy ns=0 (bài viết chính)
-        if elem.find(".//{*}redirect") is not None or ns != "0":
-            elem.clear()
+
+def iter_pages_tree(source):
+    """
+    Cách parse cũ (findtext trên từng <page>, chỉ elem.clear()). Giữ lại làm
+    chuẩn so sánh cho tools/bench_iter_pages.py; cây vẫn giữ các page rỗng
+    nên bộ nhớ tăng dần trên dump lớn.
+    """
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if strip_ns(elem.tag) != "page":
             continue
 
-        yield {
-            "page_id": page_id,
-            "title": fix_mojibake(title),
-            "timestamp": timestamp,
-            "wikitext": fix_mojibake(text),
-        }
+        doc = page_record(elem)
+        if doc is not None:
+            yield doc
 
         elem.clear()
 
 
+# ---------------- Output shards ----------------
+
+COMPRESSION_EXT = {"none": "", "gzip": ".gz", "bz2": ".bz2"}
+
+
+class ShardWriter:
+    """
+    Ghi JSONL thành nhiều shard `<prefix>-00000.jsonl[.gz|.bz2]`, chuyển sang
+    shard mới khi vượt max_bytes (tính trên dữ liệu chưa nén) hoặc max_docs.
+    bz2 là định dạng nén mà Hadoop chia split được; gzip thì mỗi shard là một split.
+    """
+
+    def __init__(self, out_dir: str, prefix: str = "wiki_raw", compression: str = "none",
+                 max_bytes: int = 0, max_docs: int = 0, state: dict = None):
+        self.out_dir = out_dir
+        self.prefix = prefix
+        self.compression = compression
+        self.max_bytes = max_bytes
+        self.max_docs = max_docs
+        self.shards = []     # các shard đã đóng
+        self.index = 0
+        self.records = 0
+        self.raw_bytes = 0
+        self.rolled = False  # True ngay sau khi vừa đóng một shard
+        self.raw = None
+        self.f = None
+        os.makedirs(out_dir, exist_ok=True)
+        if state:
+            self._restore(state)
+
+    def shard_path(self, index: int) -> str:
+        name = f"{self.prefix}-{index:05d}.jsonl{COMPRESSION_EXT[self.compression]}"
+        return os.path.join(self.out_dir, name)
+
+    def _open(self, offset: int = 0):
+        path = self.shard_path(self.index)
+        if offset:
+            self.raw = open(path, "r+b")
+            self.raw.truncate(offset)
+            self.raw.seek(offset)
+        else:
+            self.raw = open(path, "wb")
+        if self.compression == "gzip":
+            self.f = gzip.GzipFile(fileobj=self.raw, mode="wb")
+        elif self.compression == "bz2":
+            self.f = bz2.BZ2File(self.raw, mode="wb")
+        else:
+            self.f = self.raw
+
+    def write(self, line: str):
+        if self.f is None:
+            self._open()
+        data = line.encode("utf-8")
+        self.f.write(data)
+        self.records += 1
+        self.raw_bytes += len(data)
+        self.rolled = False
+        if ((self.max_docs and self.records >= self.max_docs)
+                or (self.max_bytes and self.raw_bytes >= self.max_bytes)):
+            self._close_current()
+            self.index += 1
+            self.rolled = True
+
+    def _close_current(self):
+        if self.f is None:
+            return
+        if self.f is not self.raw:
+            self.f.close()
+        self.raw.flush()
+        os.fsync(self.raw.fileno())
+        self.raw.close()
+        self.f = self.raw = None
+
+        path = self.shard_path(self.index)
+        self.shards.append({
+            "name": os.path.basename(path),
+            "records": self.records,
+            "bytes": os.path.getsize(path),
+            "raw_bytes": self.raw_bytes,
+        })
+        self.records = 0
+        self.raw_bytes = 0
+
+    def close(self):
+        self._close_current()
+        return self.shards
+
+    def state(self):
+        """
+        Trạng thái bền vững (đã fsync) để ghi checkpoint. Với output nén chỉ có
+        tại ranh giới shard; giữa chừng một shard nén thì trả về None.
+        """
+        offset = 0
+        if self.f is not None:
+            if self.f is not self.raw:
+                return None
+            self.raw.flush()
+            os.fsync(self.raw.fileno())
+            offset = self.raw.tell()
+        return {
+            "shards": list(self.shards),
+            "index": self.index,
+            "offset": offset,
+            "records": self.records,
+            "raw_bytes": self.raw_bytes,
+        }
+
+    def _restore(self, state: dict):
+        self.shards = list(state["shards"])
+        self.index = state["index"]
+        self.records = state["records"]
+        self.raw_bytes = state["raw_bytes"]
+        # xóa các shard được ghi sau thời điểm checkpoint
+        k = self.index + 1
+        while os.path.exists(self.shard_path(k)):
+            os.remove(self.shard_path(k))
+            k += 1
+        if state["offset"]:
+            self._open(state["offset"])
+
+
+def write_shard_manifest(out_dir: str, shards: list, compression: str) -> str:
+    """shards.json: tên shard, số record, kích thước để loader chia việc theo shard."""
+    path = os.path.join(out_dir, "shards.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "compression": compression,
+            "records": sum(s["records"] for s in shards),
+            "shards": shards,
+        }, f, ensure_ascii=False, indent=2)
+    return path
+
+
+# ---------------- Checkpoint / resume ----------------
+
+def load_checkpoint(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_checkpoint(path: str, state: dict):
+    # ghi file tạm rồi rename để checkpoint luôn ở trạng thái nguyên vẹn
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _id_key(page_id: str):
+    """page_id để so thứ tự: số nếu là số, không thì so chuỗi."""
+    return (0, int(page_id), "") if page_id.isdigit() else (1, 0, page_id)
+
+
+def convert_with_checkpoint(xml_path: str, out_dir: str, writer_opts: dict,
+                            every: int = 10000, resume: bool = False):
+    """
+    Chuyển tuần tự XML -> các shard JSONL, cứ `every` page (và mỗi khi chuyển
+    shard) lại ghi checkpoint gồm offset input, page_id cuối cùng và trạng thái
+    output (shard hiện tại + offset, sau fsync). Output nén chỉ checkpoint được
+    tại ranh giới shard.
+
+    Offset input là vị trí thẻ <page> của page cuối cùng đã ghi, lấy đúng lúc
+    gặp thẻ mở của page đó (RangeReader.page_starts), nên không phụ thuộc kích
+    thước page so với buffer đọc của iterparse.
+
+    Khi resume: cắt output về trạng thái đã ghi, parse lại từ offset đó và bỏ
+    qua các page có page_id không lớn hơn page_id cuối cùng (page_id trong dump
+    tăng dần), nên không trùng cũng không mất page.
+    """
+    ckpt_path = os.path.join(out_dir, "_checkpoint.json")
+    state = load_checkpoint(ckpt_path) if resume else None
+    if state and state.get("input") != os.path.abspath(xml_path):
+        raise SystemExit(f"Checkpoint {ckpt_path} thuộc input khác: {state.get('input')}")
+    if state and state.get("done"):
+        print("Checkpoint đã hoàn tất, không còn gì để làm:", out_dir)
+        return state["writer"]["shards"]
+
+    last = find_backward(xml_path, PAGE_CLOSE)
+    end = last + len(PAGE_CLOSE) if last >= 0 else 0
+
+    if state:
+        start = find_forward(xml_path, state["input_offset"], PAGE_OPEN)
+        skip_until = _id_key(state["last_page_id"])
+        pages = state["pages"]
+        writer = ShardWriter(out_dir, state=state["writer"], **writer_opts)
+        print(f"Resume từ page_id={state['last_page_id']} ({pages} page đã ghi)")
+    else:
+        start = find_forward(xml_path, 0, PAGE_OPEN)
+        skip_until = None
+        pages = 0
+        writer = ShardWriter(out_dir, **writer_opts)
+
+    def checkpoint(page_id, done=False):
+        writer_state = writer.state()
+        if writer_state is None:
+            return
+        save_checkpoint(ckpt_path, {
+            "input": os.path.abspath(xml_path),
+            "input_offset": last_start,
+            "last_page_id": page_id,
+            "pages": pages,
+            "writer": writer_state,
+            "done": done,
+        })
+
+    reader = RangeReader(xml_path, start if start >= 0 else end, end, track_pages=True)
+    current_start = None
+
+    def on_page_start():
+        nonlocal current_start
+        current_start = reader.page_starts.popleft()
+
+    last_id = state["last_page_id"] if state else None
+    last_start = state["input_offset"] if state else 0
+    try:
+        for doc in iter_pages(reader, on_page_start):
+            if skip_until is not None:
+                if _id_key(doc["page_id"]) <= skip_until:
+                    continue
+                skip_until = None
+            writer.write(json.dumps(doc, ensure_ascii=False) + "\n")
+            pages += 1
+            last_id = doc["page_id"]
+            last_start = current_start
+            if writer.rolled or pages % every == 0:
+                checkpoint(last_id)
+        writer.close()
+        checkpoint(last_id, done=True)
+    finally:
+        reader.close()
+    return writer.shards
+
+
+# ---------------- Delta / manifest ----------------
+
+def content_hash(doc: dict) -> str:
+    h = hashlib.blake2b(digest_size=8)
+    h.update(doc["title"].encode("utf-8"))
+    h.update(b"\0")
+    h.update(doc["wikitext"].encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_manifest(path: str) -> dict:
+    """Manifest: mỗi dòng `page_id<TAB>timestamp<TAB>hash` (gzip nếu đuôi .gz)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    manifest = {}
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            page_id, ts, h = line.rstrip("\n").split("\t")
+            manifest[page_id] = (ts, h)
+    return manifest
+
+
+def _in_range(page_id: str, min_id=None, max_id=None) -> bool:
+    if min_id is None and max_id is None:
+        return True
+    try:
+        i = int(page_id)
+    except ValueError:
+        return False
+    return (min_id is None or i >= min_id) and (max_id is None or i <= max_id)
+
+
+def convert_delta(docs, writer: ShardWriter, prev_manifest: str = None,
+                  manifest_out: str = None, tombstones_path: str = None,
+                  min_id=None, max_id=None) -> dict:
+    """
+    Ghi các page mới / thay đổi so với manifest lần trước (so timestamp của
+    revision và hash nội dung). Không có prev_manifest thì ghi toàn bộ.
+    Page có trong manifest cũ nhưng không còn xuất hiện được ghi vào
+    tombstones_path (mỗi dòng một page_id). manifest_out lưu manifest mới.
+
+    min_id / max_id: docs chỉ gồm page_id trong khoảng này (--page-ids); mục
+    manifest cũ ngoài khoảng không bị coi là đã xóa mà được chép sang manifest mới.
+    """
+    prev = load_manifest(prev_manifest) if prev_manifest else {}
+    stats = {"added": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+
+    mopener = gzip.open if manifest_out and manifest_out.endswith(".gz") else open
+    mf = mopener(manifest_out, "wt", encoding="utf-8") if manifest_out else None
+    try:
+        for doc in docs:
+            page_id, ts = doc["page_id"], doc["timestamp"]
+            h = content_hash(doc)
+            if mf:
+                mf.write(f"{page_id}\t{ts}\t{h}\n")
+
+            old = prev.pop(page_id, None)
+            if old is None:
+                stats["added"] += 1
+            elif old != (ts, h):
+                stats["changed"] += 1
+            else:
+                stats["unchanged"] += 1
+                continue
+            writer.write(json.dumps(doc, ensure_ascii=False) + "\n")
+
+        # những gì còn lại trong manifest cũ là page đã bị xóa / thành redirect,
+        # trừ các page nằm ngoài khoảng id của lần chạy này
+        deleted = []
+        for page_id, (ts, h) in prev.items():
+            if _in_range(page_id, min_id, max_id):
+                deleted.append(page_id)
+            elif mf:
+                mf.write(f"{page_id}\t{ts}\t{h}\n")
+    finally:
+        writer.close()
+        if mf:
+            mf.close()
+
+    stats["deleted"] = len(deleted)
+    if prev_manifest:
+        tombstones_path = tombstones_path or os.path.join(writer.out_dir, "deleted.txt")
+        with open(tombstones_path, "w", encoding="utf-8") as f:
+            for page_id in deleted:
+                f.write(page_id + "\n")
+    return stats
+
+
+# ---------------- Parallel mode ----------------
+
+class RangeReader:
+    """
+    File-like đọc đoạn [start, end) của file XML, bọc trong một thẻ gốc giả
+    để iterparse parse được một dãy <page> rời.
+
+    track_pages=True: ghi offset tuyệt đối của mọi thẻ <page> trong phần đã đọc
+    vào page_starts (theo thứ tự); người dùng lấy ra bằng popleft() mỗi khi
+    iterparse báo thẻ mở <page>. Text trong dump được escape nên chuỗi <page>
+    chỉ xuất hiện ở thẻ thật.
+    """
+
+    def __init__(self, path: str, start: int, end: int, chunk_size: int = 1 << 20,
+                 track_pages: bool = False):
+        self.f = open(path, "rb")
+        self.f.seek(start)
+        self.pos = start
+        self.end = end
+        self.chunk_size = chunk_size
+        self.prefix = b"<pages>"
+        self.suffix = b"</pages>"
+        self.page_starts = deque() if track_pages else None
+        self._carry = b""
+
+    def _track(self, data: bytes):
+        # nối phần đuôi lần đọc trước để không bỏ sót thẻ <page> bị cắt đôi
+        buf = self._carry + data
+        base = self.pos - len(buf)
+        i = buf.find(PAGE_OPEN)
+        while i >= 0:
+            self.page_starts.append(base + i)
+            i = buf.find(PAGE_OPEN, i + len(PAGE_OPEN))
+        self._carry = buf[-(len(PAGE_OPEN) - 1):]
+
+    def read(self, n: int = -1) -> bytes:
+        if self.prefix:
+            out, self.prefix = self.prefix, b""
+            return out
+        if self.pos < self.end:
+            size = self.end - self.pos
+            if n is not None and n >= 0:
+                size = min(size, n)
+            size = min(size, self.chunk_size)
+            data = self.f.read(size)
+            self.pos += len(data)
+            if data:
+                if self.page_starts is not None:
+                    self._track(data)
+                return data
+            self.pos = self.end
+        out, self.suffix = self.suffix, b""
+        return out
+
+    def close(self):
+        self.f.close()
+
+
+def find_forward(path: str, offset: int, needle: bytes, block: int = 1 << 20) -> int:
+    """Vị trí đầu tiên của needle tính từ offset, -1 nếu không có."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        carry = b""
+        base = offset
+        while True:
+            data = f.read(block)
+            if not data:
+                return -1
+            buf = carry + data
+            i = buf.find(needle)
+            if i >= 0:
+                return base - len(carry) + i
+            keep = len(needle) - 1
+            carry = buf[-keep:] if keep else b""
+            base += len(data)
+
+
+def find_backward(path: str, needle: bytes, block: int = 1 << 20) -> int:
+    """Vị trí xuất hiện cuối cùng của needle trong file, -1 nếu không có."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        carry = b""
+        while end > 0:
+            start = max(0, end - block)
+            f.seek(start)
+            buf = f.read(end - start) + carry
+            i = buf.rfind(needle)
+            if i >= 0:
+                return start + i
+            carry = buf[:len(needle) - 1]
+            end = start
+    return -1
+
+
+def split_ranges(xml_path: str, parts: int):
+    """
+    Chia file thành tối đa `parts` đoạn byte, mỗi đoạn bắt đầu đúng tại một thẻ
+    <page> và kết thúc ngay trước thẻ <page> của đoạn sau (đoạn cuối dừng sau
+    </page> cuối cùng).
+    """
+    first = find_forward(xml_path, 0, PAGE_OPEN)
+    if first < 0:
+        return []
+    last = find_backward(xml_path, PAGE_CLOSE)
+    end = last + len(PAGE_CLOSE)
+
+    step = max(1, (end - first) // parts)
+    starts = [first]
+    for k in range(1, parts):
+        off = find_forward(xml_path, first + k * step, PAGE_OPEN)
+        if off < 0 or off >= end:
+            break
+        if off > starts[-1]:
+            starts.append(off)
+
+    bounds = starts + [end]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(starts))]
+
+
+def iter_pages_range(xml_path: str, start: int, end: int):
+    reader = RangeReader(xml_path, start, end)
+    try:
+        yield from iter_pages(reader)
+    finally:
+        reader.close()
+
+
+def convert_range(args):
+    xml_path, start, end, out_dir, writer_opts = args
+    writer = ShardWriter(out_dir, **writer_opts)
+    for doc in iter_pages_range(xml_path, start, end):
+        writer.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    return writer.close()
+
+
+def convert_parallel(xml_path: str, out_dir: str, workers: int, writer_opts: dict = None):
+    """
+    Parse song song: mỗi worker xử lý một đoạn byte và ghi các shard riêng
+    `<prefix>-wNNN-MMMMM.jsonl`. Nối các shard theo thứ tự tên cho đúng kết
+    quả của iter_pages.
+    """
+    writer_opts = dict(writer_opts or {})
+    prefix = writer_opts.pop("prefix", "wiki_raw")
+    ranges = split_ranges(xml_path, workers)
+    tasks = [
+        (xml_path, start, end, out_dir, dict(writer_opts, prefix=f"{prefix}-w{i:03d}"))
+        for i, (start, end) in enumerate(ranges)
+    ]
+    shards = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for worker_shards in pool.map(convert_range, tasks):
+            shards.extend(worker_shards)
+    return shards
+
+
 if __name__ == "__main__":
-    in_path = r"D:\bd-project\data\viwiki-latest-pages-articles.xml"
-    out_path = r"D:\bd-project\data\wiki_raw.jsonl"
+    parser = argparse.ArgumentParser(description="Wikipedia XML dump -> JSONL shards")
+    parser.add_argument("input",
+                        help="viwiki-...-pages-articles.xml hoặc ...-multistream.xml.bz2")
+    parser.add_argument("-o", "--output-dir",
+                        help="thư mục output (mặc định <thư mục input>/wiki_raw)")
+    parser.add_argument("--prefix", default="wiki_raw", help="tiền tố tên shard")
+    parser.add_argument("--compression", choices=sorted(COMPRESSION_EXT), default="none",
+                        help="nén shard; bz2 chia split được trên HDFS")
+    parser.add_argument("--shard-size-mb", type=float, default=0,
+                        help="chuyển shard khi vượt N MB dữ liệu chưa nén")
+    parser.add_argument("--shard-docs", type=int, default=0,
+                        help="chuyển shard khi đủ N document")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="số process; > 1 thì mỗi worker ghi shard riêng")
+    parser.add_argument("--index", metavar="INDEX_BZ2",
+                        help="file multistream-index (mặc định suy ra từ input)")
+    parser.add_argument("--page-ids", metavar="LO-HI",
+                        help="chỉ lấy page_id trong khoảng [LO, HI] (multistream)")
+    parser.add_argument("--manifest-out", metavar="PATH",
+                        help="ghi manifest page_id/timestamp/hash của lần chạy này")
+    parser.add_argument("--prev-manifest", metavar="PATH",
+                        help="chế độ delta: chỉ ghi page mới/thay đổi so với manifest này")
+    parser.add_argument("--tombstones", metavar="PATH",
+                        help="danh sách page_id đã xóa (mặc định <output>/deleted.txt)")
+    parser.add_argument("--checkpoint-every", type=int, default=10000,
+                        help="số page giữa hai lần ghi checkpoint (chế độ tuần tự)")
+    parser.add_argument("--resume", action="store_true",
+                        help="tiếp tục từ <output>/_checkpoint.json của lần chạy trước")
+    args = parser.parse_args()
+
+    in_path = args.input
+    out_dir = args.output_dir or os.path.join(os.path.dirname(os.path.abspath(in_path)),
+                                              "wiki_raw")
+    multistream = in_path.endswith(".bz2")
+    delta = bool(args.prev_manifest or args.manifest_out)
+    if args.resume and (multistream or delta or args.workers > 1):
+        parser.error("--resume chỉ dùng cho chế độ tuần tự trên file XML")
+    if args.page_ids and not multistream:
+        parser.error("--page-ids chỉ dùng với dump multistream (.bz2)")
+
+    writer_opts = {
+        "prefix": args.prefix,
+        "compression": args.compression,
+        "max_bytes": int(args.shard_size_mb * 2**20),
+        "max_docs": args.shard_docs,
+    }
+
+    lo = hi = None
+    if multistream or delta:
+        if multistream:
+            from wiki_multistream import iter_pages_multistream, parse_id_range
+
+            lo, hi = parse_id_range(args.page_ids)
+            docs = iter_pages_multistream(in_path, args.index, workers=args.workers,
+                                          min_id=lo, max_id=hi)
+        else:
+            docs = iter_pages(in_path)
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        for doc in iter_pages(in_path):
-            f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        writer = ShardWriter(out_dir, **writer_opts)
+        if delta:
+            print("Delta:", convert_delta(docs, writer, args.prev_manifest,
+                                          args.manifest_out, args.tombstones,
+                                          min_id=lo, max_id=hi))
+        else:
+            for doc in docs:
+                writer.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        shards = writer.close()
+    elif args.workers > 1:
+        shards = convert_parallel(in_path, out_dir, args.workers, writer_opts)
+    else:
+        shards = convert_with_checkpoint(in_path, out_dir, writer_opts,
+                                         every=args.checkpoint_every, resume=args.resume)
 
-    print("Wrote:", out_path)
+    manifest = write_shard_manifest(out_dir, shards, args.compression)
+    print(f"Wrote: {len(shards)} shards, {sum(s['records'] for s in shards)} docs -> {manifest}")